@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import PlainTextResponse, Response
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.dependencies import RoleChecker, VERIFIED_TOKEN_CACHE
+from api.middleware import LOCAL_RATE_LIMITER, REQUEST_PROFILER
+from database.db_session import get_db_session
+from database.init_db import get_pool_stats
+from database.models import PizzaSizes
+from database.redis import REVOCATION_LOOKUP_BATCHER, ORDER_EVENT_HUB
+from utils.auth_utils import PWD_HASH_POOL
+from services.order_services import OrderServices, ORDER_WRITE_BATCHER, ORDER_EVENT_RELAY, ORDER_STATS_COUNTERS
+
+
+admin_router = APIRouter(dependencies=[Depends(RoleChecker(["admin"]))])
+
+ORDER_SRV = OrderServices()
+
+ORDER_STATS_DEFAULT_DAYS = 30
+ORDER_STATS_MAX_DAYS = 366
+
+
+def parse_stats_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    # Inclusive UTC day range; defaults to the last 30 days
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=ORDER_STATS_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date must not be after end date.")
+    if (end - start).days >= ORDER_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range can span at most {ORDER_STATS_MAX_DAYS} days.",
+        )
+    return start, end
+
+
+def parse_pizza_size(pizza_size: Optional[str]) -> Optional[PizzaSizes]:
+    if pizza_size is None:
+        return None
+    try:
+        return PizzaSizes(pizza_size)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Pizza size must be one of: {', '.join(size.value for size in PizzaSizes)}.",
+        )
+
+
+def sum_order_stats(rows) -> dict:
+    return {name: sum(getattr(row, name) for row in rows) for name in ORDER_STATS_COUNTERS}
+
+
+@admin_router.get("/stats", status_code=status.HTTP_200_OK)
+async def view_runtime_stats():
+    return {
+        "db_pool": get_pool_stats(),
+        "password_hash_pool": PWD_HASH_POOL.get_stats(),
+        "token_cache": VERIFIED_TOKEN_CACHE.get_stats(),
+        "order_write_batcher": ORDER_WRITE_BATCHER.get_stats(),
+        "revocation_lookup_batcher": REVOCATION_LOOKUP_BATCHER.get_stats(),
+        "rate_limiter": LOCAL_RATE_LIMITER.get_stats(),
+        "request_profiler": REQUEST_PROFILER.get_stats(),
+        "order_event_hub": ORDER_EVENT_HUB.get_stats(),
+        "order_event_relay": ORDER_EVENT_RELAY.get_stats(),
+    }
+
+
+@admin_router.get("/profiles", status_code=status.HTTP_200_OK)
+async def list_request_profiles():
+    return {"profiles": REQUEST_PROFILER.list_profiles()}
+
+
+@admin_router.get("/profiles/{profile_id}", status_code=status.HTTP_200_OK)
+async def view_request_profile(
+    profile_id: str,
+    sort_by: str = "cumulative",
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+):
+    if sort_by not in {"cumulative", "tottime", "calls"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sort key must be one of: cumulative, tottime, calls.",
+        )
+    report = REQUEST_PROFILER.render_profile(profile_id, sort_by=sort_by, limit=limit)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No profile with ID '{profile_id}' exists.")
+    return PlainTextResponse(report)
+
+
+@admin_router.get("/profiles/{profile_id}/pstats", status_code=status.HTTP_200_OK)
+async def download_request_profile(profile_id: str):
+    # Raw pstats dump, e.g. for `flameprof profile.pstats > flame.svg` or `snakeviz profile.pstats`
+    dump = REQUEST_PROFILER.dump_profile(profile_id)
+    if dump is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No profile with ID '{profile_id}' exists.")
+    return Response(
+        content=dump,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'},
+    )
+
+
+@admin_router.get("/order-stats/daily", status_code=status.HTTP_200_OK)
+async def view_daily_order_stats(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    pizza_size: Optional[str] = None,
+):
+    start, end = parse_stats_range(start, end)
+    rows = await ORDER_SRV.get_order_stats(session, start=start, end=end, pizza_size=parse_pizza_size(pizza_size))
+    days = {}
+    for row in rows:
+        days.setdefault(row.day, []).append(row)
+    return {
+        "start": start,
+        "end": end,
+        "days": [
+            {
+                "day": day,
+                **sum_order_stats(day_rows),
+                "by_size": {row.pizza_size.value: sum_order_stats([row]) for row in day_rows},
+            }
+            for day, day_rows in days.items()
+        ],
+        "totals": sum_order_stats(rows),
+    }
+
+
+@admin_router.get("/order-stats/sizes", status_code=status.HTTP_200_OK)
+async def view_order_stats_by_size(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    start, end = parse_stats_range(start, end)
+    rows = await ORDER_SRV.get_order_stats(session, start=start, end=end)
+    return {
+        "start": start,
+        "end": end,
+        "sizes": {
+            pizza_size.value: sum_order_stats([row for row in rows if row.pizza_size == pizza_size])
+            for pizza_size in PizzaSizes
+        },
+        "totals": sum_order_stats(rows),
+    }
@@ -1,5 +1,6 @@
 import json
 from json import JSONDecodeError
+from types import MappingProxyType
 from typing import Annotated
 from starlette.requests import Request
 from fastapi import status, Depends
@@ -9,8 +10,13 @@ from jwt.exceptions import ExpiredSignatureError, PyJWTError
 
 # import traceback
 
-from utils.auth_utils import decode_token
-from database.redis import is_blacklisted
+from config_loader import Config
+from utils.auth_utils import decode_token, read_user_claims
+from utils.cache import TTLCache
+from database.redis import is_token_revoked
+
+
+VERIFIED_TOKEN_CACHE = TTLCache(max_size=Config.TOKEN_CACHE_SIZE)
 
 
 class TokenBearer(HTTPBearer):
@@ -24,9 +30,30 @@ class TokenBearer(HTTPBearer):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Missing authentication credentials or invalid scheme in header.",
             )
+        token = auth_credentials.credentials
+        token_payload = VERIFIED_TOKEN_CACHE.get(token)
+        if token_payload is None:
+            token_payload = self.freeze_token_payload(self.decode_verified_token(token))
+            # Signature and claims are immutable for the token's lifetime, so reuse them until 'exp'
+            VERIFIED_TOKEN_CACHE.set(token, token_payload, expires_at=token_payload["exp"])
+        self.verify_token_payload(token_payload)
+        # Tokens issued before 'iat' existed count as issued at 0, so a revoke-all watermark still covers them
+        if await is_token_revoked(
+            jti=token_payload["jti"],
+            user_id=token_payload["sub"].get("id", ""),
+            issued_at=token_payload.get("iat", 0),
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="This token is invalid or has been revoked.",
+            )
+        request.state.user_role = token_payload["sub"].get("role")  # tag for request profiles
+        return token_payload
+
+    def decode_verified_token(self, token: str) -> dict:
         token_payload = {}
         try:
-            token_payload = decode_token(auth_credentials.credentials)
+            token_payload = decode_token(token)
         except ExpiredSignatureError:
             # traceback.print_exc()
             raise HTTPException(
@@ -39,15 +66,23 @@ class TokenBearer(HTTPBearer):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials provided.",
             )
-        self.verify_token_payload(token_payload)
-        if await is_blacklisted(token_payload["jti"]):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="This token is invalid or has been revoked.",
-            )
-        token_payload["sub"] = self.deserialize_user_data(token_payload["sub"])
+        # Routes read the user from 'sub' as a dict in both formats
+        user_data = read_user_claims(token_payload)
+        if user_data is None:
+            if not Config.JWT_ACCEPT_LEGACY_CLAIMS:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Outdated token format. Please log in again.",
+                )
+            user_data = self.deserialize_user_data(token_payload["sub"])
+        token_payload["sub"] = user_data
         return token_payload
 
+    @staticmethod
+    def freeze_token_payload(token_payload: dict) -> MappingProxyType:
+        # The cached payload is shared by every request presenting the token, so handlers get read-only views
+        return MappingProxyType({**token_payload, "sub": MappingProxyType(dict(token_payload["sub"]))})
+
     def verify_token_payload(self, token_payload: dict) -> None:
         raise NotImplementedError("No implementation found. Please override this method in child class.")
 
@@ -1,13 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 # from fastapi_jwt_auth import AuthJWT
 from api.user_routes import user_router
 from api.order_routes import order_router
+from api.admin_routes import admin_router
+from api.middleware import RateLimitMiddleware, MetricsMiddleware, ProfilingMiddleware, REQUEST_PROFILER
 
 # from api.models import Settings
 from database.init_db import init_db_models
-from database.redis import test_redis_connection, close_redis_connection
+from database.redis import (
+    test_redis_connection,
+    close_redis_connection,
+    REVOCATION_FILTER,
+    REVOCATION_LOOKUP_BATCHER,
+    ORDER_EVENT_HUB,
+)
+from utils.auth_utils import PWD_HASH_POOL, PasswordHashPoolSaturated
+from config_loader import Config
+from utils.metrics import METRICS
+from services.order_services import ORDER_WRITE_BATCHER, ORDER_EVENT_RELAY, sync_kitchen_queue
 
 
 @asynccontextmanager
@@ -15,8 +28,18 @@ async def lifespan(app: FastAPI):
     print("Server is starting...")
     await init_db_models()
     await test_redis_connection()
+    REVOCATION_FILTER.start()
+    ORDER_WRITE_BATCHER.start()
+    await sync_kitchen_queue()
+    ORDER_EVENT_RELAY.start()
     yield
+    await ORDER_WRITE_BATCHER.stop()
+    await ORDER_EVENT_RELAY.stop()
+    await ORDER_EVENT_HUB.stop()
+    await REVOCATION_LOOKUP_BATCHER.stop()
+    await REVOCATION_FILTER.stop()
     await close_redis_connection()
+    PWD_HASH_POOL.shutdown()
     print("Server has been stopped")
 
 
@@ -27,6 +50,27 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# The last middleware added runs first, so metrics also cover requests rejected by the rate limiter
+if Config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=REQUEST_PROFILER)
+if Config.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limits=Config.RATE_LIMITS)
+if Config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=Config.METRICS_SERVER_TIMING)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.exception_handler(PasswordHashPoolSaturated)
+async def password_hash_pool_saturated_handler(request: Request, exc: PasswordHashPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "The server is busy processing other requests. Please try again shortly."},
+        headers={"Retry-After": "1"},
+    )
+
 
 # @app.get("/")
 # def test():
@@ -49,3 +93,8 @@ app.include_router(
     prefix=f"/api/{version}/orders",
     tags=["orders"],
 )
+app.include_router(
+    router=admin_router,
+    prefix=f"/api/{version}/admin",
+    tags=["admin"],
+)
@@ -0,0 +1,182 @@
+import time
+from typing import Optional
+import orjson
+from redis.exceptions import RedisError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config_loader import Config
+from database.redis import hit_sliding_windows
+from utils.rate_limit import LocalRateLimiter
+from utils.metrics import REQUEST_LATENCY, REQUEST_STAGES
+from utils.profiling import RequestProfiler
+
+
+LOCAL_RATE_LIMITER = LocalRateLimiter(max_keys=Config.RATE_LIMIT_LOCAL_KEYS)
+
+REQUEST_PROFILER = RequestProfiler(
+    sample_rate=Config.PROFILING_SAMPLE_RATE,
+    threshold_ms=Config.PROFILING_THRESHOLD_MS,
+    max_profiles=Config.PROFILING_MAX_PROFILES,
+)
+
+
+async def read_request_body(receive: Receive) -> tuple[bytes, Receive]:
+    # Buffers the body and hands back a receive callable that replays it to the app
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay_receive
+
+
+def extract_username(body: bytes) -> Optional[str]:
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    username = payload.get("username") if isinstance(payload, dict) else None
+    return username.strip().lower() if isinstance(username, str) and username.strip() else None
+
+
+def get_client_ip(scope: Scope) -> str:
+    if Config.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    # Per-route limits from Config.RATE_LIMITS, keyed by client IP and/or the username in the JSON body.
+    # The local token bucket answers most rejections; allowed requests are then counted in Redis so that
+    # the limit holds across workers. If Redis is unavailable the local buckets alone apply.
+    def __init__(self, app: ASGIApp, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {scope['path']}"
+        route_limits = self.limits.get(route)
+        if not route_limits:
+            await self.app(scope, receive, send)
+            return
+
+        windows = []
+        if "ip" in route_limits:
+            windows.append((f"{route}:ip:{get_client_ip(scope)}", *route_limits["ip"]))
+        if "username" in route_limits:
+            body, receive = await read_request_body(receive)
+            username = extract_username(body)
+            if username:
+                windows.append((f"{route}:username:{username}", *route_limits["username"]))
+
+        retry_after = 0.0
+        for key, limit, window in windows:
+            retry_after = LOCAL_RATE_LIMITER.take(key, limit, window)
+            if retry_after:
+                break
+        if not retry_after and windows:
+            try:
+                retry_after = await hit_sliding_windows(windows)
+            except RedisError as e:
+                print(f"Encountered the following error while checking rate limits: {str(e)}")
+
+        if retry_after:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests. Please try again later."},
+                headers={"Retry-After": str(max(1, int(retry_after + 0.5)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    # Records request latency per route template (not raw path, to keep label cardinality bounded)
+    # and reports the request's instrumented stages in a Server-Timing header
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        stages = {}
+        stages_token = REQUEST_STAGES.set(stages)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing and stages:
+                    timings = ", ".join(f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in stages.items())
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timings.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_STAGES.reset(stages_token)
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "<unmatched>",
+                status_code,
+            )
+
+
+class ProfilingMiddleware:
+    # Keeps cProfile data of sampled requests slower than the threshold, tagged with route and user role
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Event streams stay open for minutes and would hold the (single) profiler the whole time
+        streaming = (b"accept", b"text/event-stream") in scope.get("headers", [])
+        profiler = self.profiler.start() if scope["type"] == "http" and not streaming else None
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            stages = REQUEST_STAGES.get()
+            self.profiler.finish(
+                profiler,
+                duration_ms=(time.perf_counter() - start) * 1000,
+                tags={
+                    "method": scope["method"],
+                    "route": route.path if route is not None else "<unmatched>",
+                    "role": scope.get("state", {}).get("user_role"),
+                    "stages_ms": {stage: elapsed * 1000 for stage, elapsed in (stages or {}).items()},
+                },
+            )
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 
+from database.models import OrderStatuses, PizzaSizes
+
 # -----------------------
 # ----- User Models -----
 
@@ -108,16 +110,44 @@ class Settings(BaseModel):
 
 
 class PlaceOrderModel(BaseModel):
-    quantity: int
-    order_status: str
-    pizza_size: str
+    quantity: int = Field(gt=0, le=50)
+    pizza_size: str = PizzaSizes.SMALL.value
+
+    @field_validator("pizza_size", mode="before")
+    def validate_pizza_size(cls, value):
+        if isinstance(value, str):
+            value = value.strip().lower()
+        if value not in {size.value for size in PizzaSizes}:
+            raise ValueError(f"Pizza size must be one of: {', '.join(size.value for size in PizzaSizes)}.")
+        return value
 
     class Config:
         from_attributes = True
         json_schema_extra = {
             "example": {
                 "quantity": 1,
-                "order_status": "received",
                 "pizza_size": "medium",
             }
         }
+
+
+class UpdateOrderStatusModel(BaseModel):
+    order_status: str
+
+    @field_validator("order_status", mode="before")
+    def validate_order_status(cls, value):
+        if isinstance(value, str):
+            value = value.strip().lower()
+        if value not in {order_status.value for order_status in OrderStatuses}:
+            raise ValueError(
+                f"Order status must be one of: {', '.join(order_status.value for order_status in OrderStatuses)}."
+            )
+        return value
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "order_status": "prepared",
+            }
+        }
@@ -1,8 +1,269 @@
-from fastapi import APIRouter
+import asyncio
+import uuid
+import orjson
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import PlaceOrderModel, UpdateOrderStatusModel
+from database.db_session import get_db_session
+from config_loader import Config
+from database.models import Order, OrderStatuses
+from database.redis import ORDER_EVENT_HUB, KITCHEN_QUEUE
+from services.order_services import OrderServices
+from api.dependencies import security_access, RoleChecker
+from utils.metrics import timed_stage
 
 order_router = APIRouter()
 
+ORDER_SRV = OrderServices()
+
+STAFF_ROLES = {"staff", "admin"}
+
+serialize_orders = timed_stage("serialize")(Order.serialize_many)
+
+
+def parse_order_status(order_status: Optional[str]) -> Optional[OrderStatuses]:
+    if order_status is None:
+        return None
+    try:
+        return OrderStatuses(order_status)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Order status must be one of: {', '.join(order_status.value for order_status in OrderStatuses)}.",
+        )
+
+
+def raise_for_order_message(message: str, order_id: uuid.UUID) -> None:
+    if message == "ORDER NOT FOUND":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No order with Order ID '{order_id}' exists.",
+        )
+    if message == "CLAIM NOT HELD":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This terminal doesn't hold a claim on the order (it may have expired and been reassigned).",
+        )
+    if message == "INVALID TRANSITION":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The order's current status does not allow this change.",
+        )
+
 
 @order_router.get("/")
 async def hello():
     return {"message": "Hello from orders"}
+
+
+@order_router.post("/place", status_code=status.HTTP_201_CREATED)
+async def place_order(
+    order: PlaceOrderModel,
+    token_payload: Annotated[dict, Depends(security_access)],
+):
+    new_order = await ORDER_SRV.place_order(user_id=token_payload["sub"]["id"], order=order)
+    if not new_order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unable to place the order for this account.",
+        )
+    return ORJSONResponse(new_order.to_dict(), status_code=status.HTTP_201_CREATED)
+
+
+@order_router.get("/history", status_code=status.HTTP_200_OK)
+async def view_order_history(
+    token_payload: Annotated[dict, Depends(security_access)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    cursor: Optional[str] = None,
+    order_status: Optional[str] = None,
+):
+    where_filter = {"user_id": uuid.UUID(token_payload["sub"]["id"])}
+    if order_status:
+        where_filter["order_status"] = parse_order_status(order_status)
+    try:
+        orders, next_cursor = await ORDER_SRV.get_orders_page(
+            session=session, where_filter=where_filter, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse({"orders": serialize_orders(orders), "next_cursor": next_cursor})
+
+
+@order_router.get(
+    "/list",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def list_orders(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    cursor: Optional[str] = None,
+    order_status: Optional[str] = None,
+    open_only: bool = False,
+):
+    where_filter = {"order_status": parse_order_status(order_status)} if order_status else {}
+    try:
+        orders, next_cursor = await ORDER_SRV.get_orders_page(
+            session=session, where_filter=where_filter, limit=limit, cursor=cursor, open_only=open_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse({"orders": serialize_orders(orders), "next_cursor": next_cursor})
+
+
+@order_router.get("/stream", status_code=status.HTTP_200_OK)
+async def stream_order_events(
+    request: Request,
+    token_payload: Annotated[dict, Depends(security_access)],
+    order_id: Optional[uuid.UUID] = None,
+):
+    # Server-Sent Events: customers get their own orders' status changes, staff get every order's
+    user_data = token_payload["sub"]
+    wanted_order_id = str(order_id) if order_id else None
+
+    async def event_stream():
+        # Subscribed here rather than above, so the finally below always pairs with it
+        subscription = ORDER_EVENT_HUB.subscribe(user_id=None if user_data["role"] in STAFF_ROLES else user_data["id"])
+        try:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=Config.ORDER_EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"  # also keeps proxies from closing an idle connection
+                    continue
+                if wanted_order_id is None or event["order_id"] == wanted_order_id:
+                    yield b"event: order-status\ndata: " + orjson.dumps(event) + b"\n\n"
+        finally:
+            ORDER_EVENT_HUB.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----------------------------
+# ----- Kitchen Dispatch -----
+
+
+def get_kitchen_consumer(token_payload: dict, terminal: Optional[str]) -> str:
+    # A staff member may run several terminals; each one holds its own claims
+    return f"{token_payload['sub']['username']}:{terminal or 'default'}"
+
+
+@order_router.post(
+    "/kitchen/claim",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def claim_kitchen_orders(
+    token_payload: Annotated[dict, Depends(security_access)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    count: Annotated[int, Query(ge=1, le=20)] = 1,
+    terminal: Optional[str] = None,
+):
+    orders = await ORDER_SRV.claim_kitchen_orders(
+        session=session, consumer=get_kitchen_consumer(token_payload, terminal), count=count
+    )
+    return ORJSONResponse({"orders": serialize_orders(orders), "lease_seconds": KITCHEN_QUEUE.lease_seconds})
+
+
+@order_router.post(
+    "/kitchen/{order_id}/heartbeat",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def extend_kitchen_claim(
+    order_id: uuid.UUID,
+    token_payload: Annotated[dict, Depends(security_access)],
+    terminal: Optional[str] = None,
+):
+    if not await KITCHEN_QUEUE.extend(str(order_id), get_kitchen_consumer(token_payload, terminal)):
+        raise_for_order_message("CLAIM NOT HELD", order_id)
+    return {"message": "Claim extended.", "lease_seconds": KITCHEN_QUEUE.lease_seconds}
+
+
+@order_router.post(
+    "/kitchen/{order_id}/complete",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def complete_kitchen_order(
+    order_id: uuid.UUID,
+    token_payload: Annotated[dict, Depends(security_access)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    terminal: Optional[str] = None,
+):
+    result = await ORDER_SRV.complete_kitchen_order(
+        session=session, order_id=order_id, consumer=get_kitchen_consumer(token_payload, terminal)
+    )
+    if isinstance(result, str):
+        raise_for_order_message(result, order_id)
+    return ORJSONResponse(result.to_dict())
+
+
+@order_router.get(
+    "/kitchen/queue",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def view_kitchen_queue():
+    return await KITCHEN_QUEUE.get_stats()
+
+
+@order_router.get("/{order_id}", status_code=status.HTTP_200_OK)
+async def view_order(
+    order_id: uuid.UUID,
+    token_payload: Annotated[dict, Depends(security_access)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    order = await ORDER_SRV.get_order(session=session, order_id=order_id)
+    user_data = token_payload["sub"]
+    if not order or (user_data["role"] not in STAFF_ROLES and str(order.user_id) != user_data["id"]):
+        raise_for_order_message("ORDER NOT FOUND", order_id)
+    return ORJSONResponse(order.to_dict())
+
+
+@order_router.patch(
+    "/{order_id}/status",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RoleChecker(["staff", "admin"]))],
+)
+async def update_order_status(
+    order_id: uuid.UUID,
+    update_data: UpdateOrderStatusModel,
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    result = await ORDER_SRV.update_order_status(
+        session=session, order_id=order_id, new_status=OrderStatuses(update_data.order_status)
+    )
+    if isinstance(result, str):
+        raise_for_order_message(result, order_id)
+    return ORJSONResponse(result.to_dict())
+
+
+@order_router.patch("/{order_id}/cancel", status_code=status.HTTP_200_OK)
+async def cancel_order(
+    order_id: uuid.UUID,
+    token_payload: Annotated[dict, Depends(security_access)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    user_data = token_payload["sub"]
+    result = await ORDER_SRV.cancel_order(
+        session=session,
+        order_id=order_id,
+        user_id=None if user_data["role"] in STAFF_ROLES else user_data["id"],
+    )
+    if isinstance(result, str):
+        raise_for_order_message(result, order_id)
+    return ORJSONResponse(result.to_dict())
@@ -1,6 +1,7 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, status
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Query, status
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.security import HTTPAuthorizationCredentials
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,8 +9,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from api.models import SignUpModel, LoginModel, UpdateModel
 from database.db_session import get_db_session
 from database.models import User
-from database.redis import blacklist_token
-from utils.auth_utils import verify_password, create_token, decode_token
+from database.redis import (
+    blacklist_token,
+    get_cached_profile,
+    register_sessions,
+    list_active_sessions,
+    revoke_all_sessions,
+)
+from utils.auth_utils import verify_password_async, issue_token, decode_token, JWT_KEY_SET
+from utils.pagination import build_keyset_filter
+from utils.metrics import timed_stage
 from services.user_services import UserServices
 from api.dependencies import security_access, security_refresh, RoleChecker
 
@@ -18,12 +27,22 @@ user_router = APIRouter()
 
 USER_SRV = UserServices()
 
+serialize_users = timed_stage("serialize")(User.serialize_many)
+
 
 @user_router.get("/")
 async def hello():
     return {"message": "Hello from auth"}
 
 
+@user_router.get("/.well-known/jwks.json", status_code=status.HTTP_200_OK)
+async def get_jwks():
+    # Public verification keys, so other services can verify our tokens without the shared secret
+    if JWT_KEY_SET is None:
+        return ORJSONResponse({"keys": []})
+    return ORJSONResponse(JWT_KEY_SET.get_public_jwks(), headers={"Cache-Control": "public, max-age=300"})
+
+
 @user_router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def signup(
     user: SignUpModel,
@@ -49,21 +68,21 @@ async def login(
     session: Annotated[AsyncSession, Depends(get_db_session)],
 ):
     db_user = await USER_SRV.get_user(session=session, where_filter={"username": user.username})
-    if db_user and verify_password(user.password, db_user.password):
+    if db_user and await verify_password_async(user.password, db_user.password):
         user_data = db_user.to_dict(include={"id", "username", "role"})
-        access_token = create_token(user_data=user_data)
-        refresh_token = create_token(user_data=user_data, refresh_token_flag=True)
-        if not (access_token and refresh_token):
+        access_issued = issue_token(user_data=user_data)
+        refresh_issued = issue_token(user_data=user_data, refresh_token_flag=True)
+        if not (access_issued and refresh_issued):
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Encountered an error while creating tokens. Please try again after some time.",
             )
-        await USER_SRV.update_user(
-            session=session,
-            username=db_user.username,
-            update_data=UpdateModel(is_active=True),
-            exclude_status=False,
+        (access_token, access_claims), (refresh_token, refresh_claims) = access_issued, refresh_issued
+        await register_sessions(
+            user_id=user_data["id"],
+            sessions=[(access_claims["jti"], access_claims["exp"]), (refresh_claims["jti"], refresh_claims["exp"])],
         )
+        await USER_SRV.set_user_status(session=session, username=db_user.username, is_active=True)
         return {
             "message": f"Welcome {db_user.username}.",
             "access_token": access_token,
@@ -109,10 +128,8 @@ async def delete_account(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No account with username '{username}' exists.",
         )
-    await blacklist_token(
-        jti=token_payload["jti"],
-        auto_expiry_timestamp=token_payload["exp"],
-    )
+    # Every outstanding token of the deleted account is invalidated, not just the one presented
+    await revoke_all_sessions(user_id=token_payload["sub"]["id"])
     return {"message": "Your account has been deleted."}
 
 
@@ -121,19 +138,17 @@ async def delete_account(
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(RoleChecker(["user", "staff", "admin"]))],
 )
-async def view_account_details(
-    token_payload: Annotated[dict, Depends(security_access)],
-    session: Annotated[AsyncSession, Depends(get_db_session)],
-):
+async def view_account_details(token_payload: Annotated[dict, Depends(security_access)]):
     username = token_payload["sub"]["username"]
-    user = await USER_SRV.get_user(session=session, where_filter={"username": username})
-    if not user:
+    user_serialized = await get_cached_profile(
+        username=username, loader=lambda: USER_SRV.load_user_profile(username=username)
+    )
+    if not user_serialized:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No account with username '{username}' exists.",
         )
-    user_serialized = user.to_dict(exclude={"password"})
-    return user_serialized
+    return ORJSONResponse(user_serialized)
 
 
 @user_router.get(
@@ -141,22 +156,39 @@ async def view_account_details(
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(security_access), Depends(RoleChecker(["staff", "admin"]))],
 )
-async def list_multiple_users(session: Annotated[AsyncSession, Depends(get_db_session)]):
-    users = await USER_SRV.get_multiple_users(session=session, order_by_cols=[("created_at", 1)])
-    users_serialized = [*(user.to_dict(exclude={"password"}) for user in users)]
-    return users_serialized
+async def list_multiple_users(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
+    if stream:
+        # Validate the cursor up front; errors raised mid-stream can no longer change the status code
+        try:
+            build_keyset_filter(cursor, "created_at")
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return StreamingResponse(USER_SRV.stream_users(cursor=cursor), media_type="application/x-ndjson")
+    try:
+        users, next_cursor = await USER_SRV.get_users_page(session=session, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    users_serialized = serialize_users(users, exclude={"password"})
+    return ORJSONResponse({"users": users_serialized, "next_cursor": next_cursor})
 
 
 @user_router.get("/refresh-token", status_code=status.HTTP_200_OK)
 async def generate_new_access_token(token_payload: Annotated[dict, Depends(security_refresh)]):
     user_data = token_payload["sub"]
     # print(user_data, type(user_data))
-    access_token = create_token(user_data=user_data)
-    if not access_token:
+    access_issued = issue_token(user_data=user_data)
+    if not access_issued:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Encountered an error while creating tokens. Please try again after some time.",
         )
+    access_token, access_claims = access_issued
+    await register_sessions(user_id=user_data["id"], sessions=[(access_claims["jti"], access_claims["exp"])])
     return {"new_access_token": access_token}
 
 
@@ -169,10 +201,21 @@ async def logout(
         jti=token_payload["jti"],
         auto_expiry_timestamp=token_payload["exp"],
     )
-    await USER_SRV.update_user(
-        session=session,
-        username=token_payload["sub"]["username"],
-        update_data=UpdateModel(is_active=False),
-        exclude_status=False,
-    )
+    await USER_SRV.set_user_status(session=session, username=token_payload["sub"]["username"], is_active=False)
     return {"message": "Logged out successfully."}
+
+
+@user_router.get("/logout/all", status_code=status.HTTP_200_OK)
+async def logout_all_sessions(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    token_payload: Annotated[dict, Depends(security_access)],
+):
+    await revoke_all_sessions(user_id=token_payload["sub"]["id"])
+    await USER_SRV.set_user_status(session=session, username=token_payload["sub"]["username"], is_active=False)
+    return {"message": "Logged out of all sessions successfully."}
+
+
+@user_router.get("/account/sessions", status_code=status.HTTP_200_OK)
+async def view_active_sessions(token_payload: Annotated[dict, Depends(security_access)]):
+    sessions = await list_active_sessions(user_id=token_payload["sub"]["id"])
+    return {"sessions": [{"jti": jti, "expires_at": expires_at} for jti, expires_at in sessions]}
@@ -0,0 +1,221 @@
+# Load test of the auth and order endpoints with the app running in-process (no server, no network).
+# Redis is replaced by fakeredis; the database is a throwaway SQLite file through aiosqlite unless
+# DATABASE_URL points somewhere else (e.g. a local Postgres - its tables must be empty of bench users).
+# Each scenario reports throughput and p50/p95/p99 latencies; results are saved as JSON, and a previous
+# result file can be passed with --compare to print the change per scenario.
+# Usage (from the src directory):
+#     python -m benchmarks.api_bench [--requests 200] [--concurrency 16] [--output path] [--compare old.json]
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = tempfile.mkdtemp(prefix="api_bench_")
+# Must be in place before the app (and so Config) is imported; explicit environment values still win
+BENCH_ENVIRONMENT = {
+    "DATABASE_URL": f"sqlite+aiosqlite:///{BENCH_DIR}/bench.db",
+    "DB_ECHO": "false",
+    "REDIS_USE_FAKE": "true",
+    "RATE_LIMIT_ENABLED": "false",
+    "PROFILING_ENABLED": "false",
+    "POSTGRES_USERNAME": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DBNAME": "bench",
+    "JWT_SECRET": "bench-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXP": "15",
+    "REFRESH_TOKEN_EXP": "24",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+}
+for name, value in BENCH_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+
+from api.main import app
+from database.init_db import database_url, engine
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "bench-password"
+
+
+class BenchState:
+    # Users and tokens shared between scenarios; scenarios run in order and later ones reuse earlier output
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.usernames: list[str] = []
+        self.access_tokens: list[str] = []
+        self.refresh_tokens: list[str] = []
+        self.admin_token = ""
+
+    def username(self, i: int) -> str:
+        return f"b{self.run_id}_{i}"  # within the 20 character limit of User.username
+
+
+async def signup(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    username = state.username(i)
+    state.usernames.append(username)
+    return await client.post("/api/v1/auth/signup", json={"username": username, "password": PASSWORD, "role": "user"})
+
+
+async def login(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    username = state.usernames[i % len(state.usernames)]
+    response = await client.post("/api/v1/auth/login", json={"username": username, "password": PASSWORD})
+    if response.status_code == 200:
+        state.access_tokens.append(response.json()["access_token"])
+        state.refresh_tokens.append(response.json()["refresh_token"])
+    return response
+
+
+async def refresh_token(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    token = state.refresh_tokens[i % len(state.refresh_tokens)]
+    return await client.get("/api/v1/auth/refresh-token", headers={"Authorization": f"Bearer {token}"})
+
+
+async def view_account(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    token = state.access_tokens[i % len(state.access_tokens)]
+    return await client.get("/api/v1/auth/account/view", headers={"Authorization": f"Bearer {token}"})
+
+
+async def list_users(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    return await client.get(
+        "/api/v1/auth/list/users", params={"limit": 50}, headers={"Authorization": f"Bearer {state.admin_token}"}
+    )
+
+
+async def place_order(client: httpx.AsyncClient, state: BenchState, i: int) -> httpx.Response:
+    token = state.access_tokens[i % len(state.access_tokens)]
+    return await client.post(
+        "/api/v1/orders/place",
+        json={"quantity": 1 + i % 3, "pizza_size": ["small", "medium", "large", "extra-large"][i % 4]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+SCENARIOS = {
+    "signup": signup,
+    "login": login,
+    "refresh_token": refresh_token,
+    "view_account": view_account,
+    "list_users": list_users,
+    "place_order": place_order,
+}
+
+
+async def setup_admin(client: httpx.AsyncClient, state: BenchState) -> None:
+    username = f"a{state.run_id}"
+    await client.post("/api/v1/auth/signup", json={"username": username, "password": PASSWORD, "role": "admin"})
+    response = await client.post("/api/v1/auth/login", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    state.admin_token = response.json()["access_token"]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cut_points[49] * 1000,
+        "p95_ms": cut_points[94] * 1000,
+        "p99_ms": cut_points[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, state: BenchState, scenario, requests: int, concurrency: int):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_request(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await scenario(client, state, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_request(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmarks(requests: int, concurrency: int) -> dict:
+    state = BenchState(run_id=str(int(time.time()))[-6:])
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await setup_admin(client, state)
+            for name, scenario in SCENARIOS.items():
+                results[name] = await run_scenario(client, state, scenario, requests, concurrency)
+                print(
+                    f"{name:>14}: {results[name]['throughput_rps']:8.1f} req/s  "
+                    f"p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+                    f"p99 {results[name]['p99_ms']:8.2f} ms  errors {results[name]['errors']}"
+                )
+    await engine.dispose()  # pooled aiosqlite connections hold non-daemon threads
+    return {
+        "commit": get_git_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "database": database_url.get_backend_name(),
+        "requests": requests,
+        "concurrency": concurrency,
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    print(f"\nChange against {previous.get('commit')} ({previous.get('recorded_at')}):")
+    for name, result in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        changes = "  ".join(
+            f"{metric} {(result[metric] - old[metric]) / old[metric] * 100:+6.1f}%"
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+            if old[metric]
+        )
+        print(f"{name:>14}: {changes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="In-process load test of the auth and order endpoints.")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", type=Path, default=None, help="defaults to benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmarks(requests=args.requests, concurrency=args.concurrency))
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# Seeds a scratch schema with many orders and compares plans/latency of the order lookup queries
+# with and without the indexes declared on the Order model (see the 3c9a1f7d2b64 migration).
+# Needs the Postgres configured in .env; everything is created in, and dropped with, a scratch schema.
+# Usage (from the src directory): python -m benchmarks.order_indexes_bench [orders] [users] [repeats]
+import sys
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from database.init_db import database_url
+from database.models import Base, Order, OPEN_ORDERS_PREDICATE
+
+BENCH_SCHEMA = "order_index_bench"
+
+SEED_USERS_SQL = f"""
+INSERT INTO {BENCH_SCHEMA}.users (id, username, password, role, is_verified, is_active, created_at)
+SELECT gen_random_uuid(), 'bench_' || g, 'x', 'user', false, false, now()
+FROM generate_series(1, :users) AS g
+"""
+
+# ~3% of orders are still open, the rest are delivered or cancelled, spread over the last year
+SEED_ORDERS_SQL = f"""
+WITH bench_users AS (SELECT array_agg(id) AS ids FROM {BENCH_SCHEMA}.users)
+INSERT INTO {BENCH_SCHEMA}.orders (id, quantity, order_status, pizza_size, user_id, time_of_order)
+SELECT
+    gen_random_uuid(),
+    1 + floor(random() * 4)::int,
+    CASE
+        WHEN r < 0.01 THEN 'received'
+        WHEN r < 0.02 THEN 'prepared'
+        WHEN r < 0.03 THEN 'in-transit'
+        WHEN r < 0.10 THEN 'cancelled'
+        ELSE 'delivered'
+    END,
+    (ARRAY['small', 'medium', 'large', 'extra-large'])[1 + floor(random() * 4)::int],
+    bench_users.ids[1 + floor(random() * array_length(bench_users.ids, 1))::int],
+    now() - random() * interval '365 days'
+FROM (SELECT g, random() AS r FROM generate_series(1, :orders) AS g) AS seeded, bench_users
+"""
+
+# Same shapes as OrderServices.get_orders_page emits
+QUERIES = {
+    "user order history": (
+        f"SELECT * FROM {BENCH_SCHEMA}.orders WHERE user_id = :user_id ORDER BY time_of_order DESC, id DESC LIMIT 51"
+    ),
+    "orders by status": (
+        f"SELECT * FROM {BENCH_SCHEMA}.orders WHERE order_status = 'prepared' "
+        "ORDER BY time_of_order DESC, id DESC LIMIT 51"
+    ),
+    "open orders": (
+        f"SELECT * FROM {BENCH_SCHEMA}.orders WHERE {OPEN_ORDERS_PREDICATE} "
+        "ORDER BY time_of_order DESC, id DESC LIMIT 51"
+    ),
+}
+
+
+def set_indexes(conn: Connection, enabled: bool) -> None:
+    for index in Order.__table__.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {BENCH_SCHEMA}.{index.name}"))
+        if enabled:
+            index.create(conn)
+    conn.execute(text(f"ANALYZE {BENCH_SCHEMA}.orders"))
+
+
+def measure(conn: Connection, repeats: int, user_id) -> None:
+    for label, sql in QUERIES.items():
+        params = {"user_id": user_id}
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            conn.execute(text(sql), params).all()
+        avg_ms = (time.perf_counter() - start) / repeats * 1000
+        print(f"--- {label}: {avg_ms:.3f} ms avg over {repeats} runs")
+        print("\n".join(f"    {line}" for line in plan))
+
+
+def main(orders: int, users: int, repeats: int) -> None:
+    engine = create_engine(
+        database_url,
+        execution_options={"schema_translate_map": {None: BENCH_SCHEMA}},
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+            Base.metadata.create_all(conn)
+            print(f"Seeding {users} users and {orders} orders...")
+            conn.execute(text(SEED_USERS_SQL), {"users": users})
+            conn.execute(text(SEED_ORDERS_SQL), {"orders": orders})
+            user_id = conn.execute(text(f"SELECT user_id FROM {BENCH_SCHEMA}.orders LIMIT 1")).scalar_one()
+
+        for enabled in (False, True):
+            with engine.begin() as conn:
+                set_indexes(conn, enabled)
+                print(f"\n===== {'with' if enabled else 'without'} order indexes =====")
+                measure(conn, repeats, user_id)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1_000_000, 10_000, 50][len(args) :]))
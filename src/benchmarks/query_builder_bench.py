@@ -0,0 +1,69 @@
+# Compares build_select_query against build_cached_select_query, both for statement
+# construction alone and for build + execute against an in-memory SQLite database.
+# Usage (from the src directory): python -m benchmarks.query_builder_bench [iterations]
+import sys
+import timeit
+import uuid
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database.models import Base, User
+from utils.query_builder import build_select_query, build_cached_select_query
+
+
+FILTERS = [
+    ({"username": "johndoe"}, []),
+    ({"email": "johndoe@email.com"}, []),
+    ({"_or": [{"username": "johndoe"}, {"email__ilike": "%@email.com"}]}, [("created_at", 1)]),
+]
+
+
+def run_build(builder) -> None:
+    for where_filter, order_by_cols in FILTERS:
+        builder(model=User, where_filter=where_filter, order_by_cols=order_by_cols)
+
+
+def run_execute(session: Session, cached: bool) -> None:
+    for where_filter, order_by_cols in FILTERS:
+        if cached:
+            statement, params = build_cached_select_query(
+                model=User, where_filter=where_filter, order_by_cols=order_by_cols
+            )
+            session.execute(statement, params).scalars().first()
+        else:
+            statement = build_select_query(model=User, where_filter=where_filter, order_by_cols=order_by_cols)
+            session.execute(statement).scalars().first()
+
+
+def report(label: str, seconds: float, iterations: int) -> None:
+    per_call_us = seconds / (iterations * len(FILTERS)) * 1_000_000
+    print(f"{label:<32} {seconds:8.3f}s total  {per_call_us:8.2f}us/query")
+
+
+def main(iterations: int) -> None:
+    report("build (current)", timeit.timeit(lambda: run_build(build_select_query), number=iterations), iterations)
+    report(
+        "build (cached)",
+        timeit.timeit(lambda: run_build(build_cached_select_query), number=iterations),
+        iterations,
+    )
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=uuid.uuid4(), username="johndoe", email="johndoe@email.com", password="x"))
+        session.commit()
+        report(
+            "build + execute (current)",
+            timeit.timeit(lambda: run_execute(session, cached=False), number=iterations),
+            iterations,
+        )
+        report(
+            "build + execute (cached)",
+            timeit.timeit(lambda: run_execute(session, cached=True), number=iterations),
+            iterations,
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,90 @@
+# Compares the token decode path for legacy tokens (JSON-encoded user data in 'sub', parsed a second time)
+# against compact tokens (native 'sub' + 'role'/'uname' claims), both cold and behind the verified-token cache.
+# The request mix replays a pool of active sessions where a few busy users send most of the requests,
+# and a share of the requests come with a freshly issued token that always misses the cache.
+# Usage (from the src directory): python -m benchmarks.token_decode_bench [requests] [sessions] [fresh_ratio]
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+import jwt
+
+from config_loader import Config
+from utils.auth_utils import issue_token, get_signing_params
+from utils.cache import TTLCache
+from api.dependencies import security_access
+
+
+def issue_legacy_token(user_data: dict) -> str:
+    # The pre-compact claim format, kept here only to measure against
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": json.dumps(user_data),
+        "exp": int((now + timedelta(minutes=Config.ACCESS_TOKEN_EXP)).timestamp()),
+        "iat": round(now.timestamp(), 3),
+        "jti": str(uuid.uuid4()),
+        "is_refresh": False,
+    }
+    signing_key, algorithm, headers = get_signing_params()
+    return jwt.encode(payload=payload, key=signing_key, algorithm=algorithm, headers=headers)
+
+
+def issue_compact_token(user_data: dict) -> str:
+    return issue_token(user_data=user_data)[0]
+
+
+def make_user(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "username": f"bench_user_{i}", "role": random.choice(["user", "user", "staff"])}
+
+
+def build_request_mix(issuer, requests: int, sessions: int, fresh_ratio: float) -> list[str]:
+    session_tokens = [issuer(make_user(i)) for i in range(sessions)]
+    weights = [1 / (rank + 1) for rank in range(sessions)]
+    mix = random.choices(session_tokens, weights=weights, k=requests)
+    for i in range(int(requests * fresh_ratio)):
+        mix[random.randrange(requests)] = issuer(make_user(sessions + i))
+    return mix
+
+
+def run_cold(tokens: list[str]) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        security_access.decode_verified_token(token)
+    return time.perf_counter() - start
+
+
+def run_cached(tokens: list[str]) -> float:
+    # Mirrors TokenBearer.__call__ without the revocation lookup
+    cache = TTLCache(max_size=Config.TOKEN_CACHE_SIZE)
+    start = time.perf_counter()
+    for token in tokens:
+        token_payload = cache.get(token)
+        if token_payload is None:
+            token_payload = security_access.decode_verified_token(token)
+            cache.set(token, token_payload, expires_at=token_payload["exp"])
+        security_access.verify_token_payload(token_payload)
+    return time.perf_counter() - start
+
+
+def main(requests: int, sessions: int, fresh_ratio: float) -> None:
+    random.seed(42)
+    for label, issuer in (("legacy", issue_legacy_token), ("compact", issue_compact_token)):
+        tokens = build_request_mix(issuer, requests, sessions, fresh_ratio)
+        avg_size = sum(len(token) for token in tokens) / len(tokens)
+        cold = run_cold(tokens)
+        cached = run_cached(tokens)
+        print(
+            f"{label:>8}: {avg_size:.0f} bytes/token, "
+            f"cold {cold / requests * 1e6:.2f} us/req, cached mix {cached / requests * 1e6:.2f} us/req"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        requests=int(args[0]) if len(args) > 0 else 50_000,
+        sessions=int(args[1]) if len(args) > 1 else 2_000,
+        fresh_ratio=float(args[2]) if len(args) > 2 else 0.05,
+    )
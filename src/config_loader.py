@@ -1,18 +1,71 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    APP_ENV: str = "development"  # "production" disables SQL echo unless DB_ECHO is set
     POSTGRES_USERNAME: str
     POSTGRES_PASSWORD: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
     POSTGRES_DBNAME: str
+    DATABASE_URL: Optional[str] = None  # overrides the POSTGRES_* settings, e.g. sqlite+aiosqlite for benchmarks
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
     JWT_SECRET: str
     JWT_ALGORITHM: str
+    JWT_JWKS_FILE: Optional[str] = None  # JWKS with EdDSA/ES256 keys; tokens are signed with JWT_SIGNING_KEY_ID
+    JWT_SIGNING_KEY_ID: Optional[str] = None
+    JWT_KEYS_RELOAD_INTERVAL: float = 30.0
+    JWT_ACCEPT_SECRET_TOKENS: bool = True  # keep accepting JWT_SECRET-signed tokens (no 'kid') while migrating
+    JWT_ACCEPT_LEGACY_CLAIMS: bool = True  # keep accepting tokens whose 'sub' is the JSON-encoded user data
     ACCESS_TOKEN_EXP: int
     REFRESH_TOKEN_EXP: int
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_USE_FAKE: bool = False
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_LOOKUP_BATCH_SIZE: int = 256
+    REVOCATION_NEAR_CACHE: bool = True
+    PROFILE_CACHE_TTL: int = 300
+    PROFILE_CACHE_LOCK_MS: int = 500
+    PROFILE_LOCAL_CACHE_TTL: float = 2.0
+    PROFILE_LOCAL_CACHE_SIZE: int = 10000
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+    TOKEN_CACHE_SIZE: int = 10000
+    ORDER_BATCH_MAX_SIZE: int = 100
+    ORDER_BATCH_MAX_DELAY_MS: float = 5.0
+    ORDER_EVENTS_CLIENT_QUEUE_SIZE: int = 100
+    ORDER_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    ORDER_EVENTS_BATCH_SIZE: int = 500  # outbox rows the relay publishes per transaction
+    ORDER_EVENTS_POLL_INTERVAL_MS: float = 200.0  # relay poll when idle; local commits wake it immediately
+    ORDER_EVENTS_MAX_BACKOFF_SECONDS: float = 5.0  # cap of the relay's retry delay while Redis/Postgres fail
+    KITCHEN_CLAIM_LEASE_SECONDS: float = 900.0  # unacknowledged claims go back to the queue after this
+    METRICS_ENABLED: bool = True
+    METRICS_SERVER_TIMING: bool = True
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.01  # share of requests run under cProfile while enabled
+    PROFILING_THRESHOLD_MS: float = 500.0  # sampled requests faster than this are discarded
+    PROFILING_MAX_PROFILES: int = 20
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # only behind a proxy that sets X-Forwarded-For
+    RATE_LIMIT_LOCAL_KEYS: int = 100000
+    # "METHOD path" -> {"ip" | "username": (limit, window_seconds)}; overridable as JSON in the environment
+    RATE_LIMITS: dict[str, dict[str, tuple[int, int]]] = {
+        "POST /api/v1/auth/login": {"ip": (20, 60), "username": (5, 60)},
+        "POST /api/v1/auth/signup": {"ip": (5, 60)},
+    }
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,19 +1,117 @@
-from sqlalchemy import URL
+import time
+from sqlalchemy import URL, event, exc, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine
 from config_loader import Config
 from database.models import Base
+from utils.metrics import record_stage
 
 
-database_url = URL.create(
-    drivername="postgresql+psycopg",
-    username=Config.POSTGRES_USERNAME,
-    password=Config.POSTGRES_PASSWORD,
-    host=Config.POSTGRES_HOST,
-    port=Config.POSTGRES_PORT,
-    database=Config.POSTGRES_DBNAME,
+database_url = (
+    make_url(Config.DATABASE_URL)
+    if Config.DATABASE_URL
+    else URL.create(
+        drivername="postgresql+psycopg",
+        username=Config.POSTGRES_USERNAME,
+        password=Config.POSTGRES_PASSWORD,
+        host=Config.POSTGRES_HOST,
+        port=Config.POSTGRES_PORT,
+        database=Config.POSTGRES_DBNAME,
+    )
 )
 
-engine = create_async_engine(url=database_url, echo=True)
+
+# --------------------------------
+# ----- Pool Instrumentation -----
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.connections_created = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, elapsed: float) -> None:
+        self.checkouts += 1
+        self.wait_total += elapsed
+        self.wait_max = max(self.wait_max, elapsed)
+
+
+POOL_STATS = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_STATS.timeouts += 1
+            raise
+        finally:
+            POOL_STATS.record_wait(time.perf_counter() - start)
+
+
+def get_engine_options() -> dict:
+    echo = Config.DB_ECHO if Config.DB_ECHO is not None else Config.APP_ENV != "production"
+    options = {
+        "echo": echo,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    }
+    if Config.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={Config.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+engine = create_async_engine(url=database_url, **get_engine_options())
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def on_pool_connect(dbapi_connection, connection_record):
+    POOL_STATS.connections_created += 1
+    if engine.sync_engine.pool.overflow() > 0:
+        POOL_STATS.overflow_events += 1
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_stage("db_query", time.perf_counter() - conn.info["query_start_times"].pop())
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def on_query_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_times"):
+        connection.info["query_start_times"].pop()
+
+
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "checkouts": POOL_STATS.checkouts,
+        "connections_created": POOL_STATS.connections_created,
+        "overflow_events": POOL_STATS.overflow_events,
+        "timeouts": POOL_STATS.timeouts,
+        "avg_wait_ms": (POOL_STATS.wait_total / POOL_STATS.checkouts * 1000) if POOL_STATS.checkouts else 0.0,
+        "max_wait_ms": POOL_STATS.wait_max * 1000,
+    }
 
 
 async def init_db_models():
@@ -0,0 +1,54 @@
+"""Added order lookup indexes
+
+Revision ID: 3c9a1f7d2b64
+Revises: fef436b63856
+Create Date: 2026-10-18 10:12:45.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.models import OPEN_ORDERS_PREDICATE
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9a1f7d2b64"
+down_revision: Union[str, None] = "fef436b63856"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so that existing order traffic isn't blocked on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_user_id_time_of_order",
+            "orders",
+            ["user_id", sa.text("time_of_order DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_orders_order_status_time_of_order",
+            "orders",
+            ["order_status", sa.text("time_of_order DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_orders_open_time_of_order",
+            "orders",
+            [sa.text("time_of_order DESC"), sa.text("id DESC")],
+            postgresql_where=sa.text(OPEN_ORDERS_PREDICATE),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_orders_open_time_of_order", table_name="orders", postgresql_concurrently=True)
+        op.drop_index("ix_orders_order_status_time_of_order", table_name="orders", postgresql_concurrently=True)
+        op.drop_index("ix_orders_user_id_time_of_order", table_name="orders", postgresql_concurrently=True)
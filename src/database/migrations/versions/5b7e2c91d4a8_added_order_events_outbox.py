@@ -0,0 +1,45 @@
+"""Added order events outbox
+
+Revision ID: 5b7e2c91d4a8
+Revises: 3c9a1f7d2b64
+Create Date: 2026-10-18 21:05:37.402118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+from src.database.models import OrderStatuses
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2c91d4a8"
+down_revision: Union[str, None] = "3c9a1f7d2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "order_events",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("order_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "order_status",
+            sqlalchemy_utils.types.choice.ChoiceType(choices=OrderStatuses, impl=sa.String()),
+            nullable=False,
+        ),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("order_events")
@@ -0,0 +1,45 @@
+"""Added order daily stats
+
+Revision ID: 8d3f6a2e1c57
+Revises: 5b7e2c91d4a8
+Create Date: 2026-10-18 23:12:08.615493
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+from src.database.models import PizzaSizes
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f6a2e1c57"
+down_revision: Union[str, None] = "5b7e2c91d4a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "order_daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column(
+            "pizza_size",
+            sqlalchemy_utils.types.choice.ChoiceType(choices=PizzaSizes, impl=sa.String()),
+            nullable=False,
+        ),
+        sa.Column("orders_placed", sa.Integer(), nullable=False),
+        sa.Column("pizzas_ordered", sa.Integer(), nullable=False),
+        sa.Column("orders_cancelled", sa.Integer(), nullable=False),
+        sa.Column("pizzas_cancelled", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "pizza_size"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("order_daily_stats")
@@ -0,0 +1,46 @@
+"""Made keyset columns not null and indexed users for keyset pagination
+
+Revision ID: a6c4e8f2b913
+Revises: 8d3f6a2e1c57
+Create Date: 2026-10-19 00:41:53.208716
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c4e8f2b913"
+down_revision: Union[str, None] = "8d3f6a2e1c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination sorts on these columns; rows without a timestamp (only possible from outside the app)
+    # are dated to the epoch so they sort last in the newest-first listings
+    op.execute("UPDATE users SET created_at = 'epoch' WHERE created_at IS NULL")
+    op.execute("UPDATE orders SET time_of_order = 'epoch' WHERE time_of_order IS NULL")
+    op.alter_column("users", "created_at", existing_type=postgresql.TIMESTAMP(timezone=True), nullable=False)
+    op.alter_column("orders", "time_of_order", existing_type=postgresql.TIMESTAMP(timezone=True), nullable=False)
+    # Serves the (created_at DESC, id DESC) user listing; built concurrently like the order lookup indexes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_created_at_id",
+            "users",
+            [sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_created_at_id", table_name="users", postgresql_concurrently=True)
+    op.alter_column("orders", "time_of_order", existing_type=postgresql.TIMESTAMP(timezone=True), nullable=True)
+    op.alter_column("users", "created_at", existing_type=postgresql.TIMESTAMP(timezone=True), nullable=True)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from typing import Callable, Iterable, Optional
+from operator import attrgetter
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, Date, DateTime, Uuid, Index, JSON, text
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
 from sqlalchemy_utils import ChoiceType
 from enum import Enum
+import orjson
 import uuid
 from datetime import datetime, timezone
 
@@ -12,24 +15,55 @@ Base = declarative_base()
 # ----- Serializer Class -----
 
 
+def get_column_converter(column: Column) -> Optional[Callable]:
+    # Resolved once per column from its declared type, instead of isinstance checks on every value
+    column_type = column.type
+    if isinstance(column_type, Uuid):
+        return str
+    if isinstance(column_type, DateTime):
+        return datetime.isoformat
+    if isinstance(column_type, ChoiceType) and isinstance(column_type.choices, type):
+        if issubclass(column_type.choices, Enum):
+            return attrgetter("value")
+    return None
+
+
 class CustomSerializerMixin:
-    def to_dict(self, include: set[str] = set(), exclude: set[str] = set()):
+    _serializer_plans: dict = {}
+
+    @classmethod
+    def get_serializer_plan(cls, include: frozenset, exclude: frozenset) -> tuple:
+        plan_key = (cls, include, exclude)
+        plan = CustomSerializerMixin._serializer_plans.get(plan_key)
+        if plan is None:
+            plan = tuple(
+                (column.name, get_column_converter(column))
+                for column in cls.__table__.columns
+                if not ((include and column.name not in include) or (column.name in exclude))
+            )
+            CustomSerializerMixin._serializer_plans[plan_key] = plan
+        return plan
+
+    @staticmethod
+    def apply_serializer_plan(obj, plan: tuple) -> dict:
         result = {}
-        for column in self.__table__.columns:
-            if (include and column.name not in include) or (column.name in exclude):
-                continue
-            column_name = column.name
-            column_value = getattr(self, column_name)
-            if isinstance(column_value, uuid.UUID):
-                result[column_name] = str(column_value)
-            elif isinstance(column_value, datetime):
-                result[column_name] = column_value.isoformat()
-            elif isinstance(column_value, Enum):
-                result[column_name] = column_value.value
-            else:
-                result[column_name] = column_value
+        for column_name, converter in plan:
+            column_value = getattr(obj, column_name)
+            result[column_name] = converter(column_value) if (converter and column_value is not None) else column_value
         return result
 
+    def to_dict(self, include: set[str] = set(), exclude: set[str] = set()) -> dict:
+        plan = self.get_serializer_plan(frozenset(include), frozenset(exclude))
+        return self.apply_serializer_plan(self, plan)
+
+    def to_json(self, include: set[str] = set(), exclude: set[str] = set()) -> bytes:
+        return orjson.dumps(self.to_dict(include=include, exclude=exclude))
+
+    @classmethod
+    def serialize_many(cls, objs: Iterable, include: set[str] = set(), exclude: set[str] = set()) -> list[dict]:
+        plan = cls.get_serializer_plan(frozenset(include), frozenset(exclude))
+        return [cls.apply_serializer_plan(obj, plan) for obj in objs]
+
 
 # ------------------------
 # ----- User Schemas -----
@@ -43,6 +77,7 @@ class Roles(Enum):
 
 class User(Base, CustomSerializerMixin):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", text("created_at DESC"), text("id DESC")),)
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(20), unique=True, nullable=False)
     email = Column(String(254), unique=True)
@@ -50,7 +85,7 @@ class User(Base, CustomSerializerMixin):
     role = Column(ChoiceType(choices=Roles, impl=String()), default=Roles.USER)
     is_verified = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     orders = relationship(
         "Order",
         back_populates="user",
@@ -80,14 +115,32 @@ class PizzaSizes(Enum):
     EXTRA_LARGE = "extra-large"
 
 
+OPEN_ORDER_STATUSES = (OrderStatuses.RECEIVED, OrderStatuses.PREPARED, OrderStatuses.IN_TRANSIT)
+
+# Shared by the partial index and the queries that rely on it, so the planner can match them
+OPEN_ORDERS_PREDICATE = "order_status IN ({})".format(
+    ", ".join(f"'{order_status.value}'" for order_status in OPEN_ORDER_STATUSES)
+)
+
+
 class Order(Base, CustomSerializerMixin):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_time_of_order", "user_id", text("time_of_order DESC"), text("id DESC")),
+        Index("ix_orders_order_status_time_of_order", "order_status", text("time_of_order DESC"), text("id DESC")),
+        Index(
+            "ix_orders_open_time_of_order",
+            text("time_of_order DESC"),
+            text("id DESC"),
+            postgresql_where=text(OPEN_ORDERS_PREDICATE),
+        ),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     quantity = Column(Integer, nullable=False)
     order_status = Column(ChoiceType(choices=OrderStatuses, impl=String()), default=OrderStatuses.RECEIVED)
     pizza_size = Column(ChoiceType(choices=PizzaSizes, impl=String()), default=PizzaSizes.SMALL)
     user_id = Column(UUID(as_uuid=True), ForeignKey(column="users.id", ondelete="CASCADE"))
-    time_of_order = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc))
+    time_of_order = Column(TIMESTAMP(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
     user = relationship(
         "User",
         back_populates="orders",
@@ -95,3 +148,35 @@ class Order(Base, CustomSerializerMixin):
 
     def __repr__(self):
         return f"<Order {self.id}>"
+
+
+class OrderEvent(Base, CustomSerializerMixin):
+    # Transactional outbox: written in the same transaction as the order change, then drained and
+    # published by the relay (services/order_services.py), which deletes the rows it has delivered
+    __tablename__ = "order_events"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    order_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    order_status = Column(ChoiceType(choices=OrderStatuses, impl=String()), nullable=False)
+    payload = Column(JSON, nullable=False)  # order snapshot consumers need (e.g. the kitchen's priority inputs)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<OrderEvent {self.id} {self.order_id}>"
+
+
+class OrderDailyStats(Base, CustomSerializerMixin):
+    # Rollup of orders per UTC day of placement and pizza size, kept up to date in the same transaction as
+    # each order insert, status change or account deletion (services/order_services.py). It covers exactly
+    # the orders in the table: orders deleted with their account are subtracted. Cancellations count against
+    # the day the order was placed, so the table can always be rebuilt from orders (backfill_order_stats.py).
+    __tablename__ = "order_daily_stats"
+    day = Column(Date, primary_key=True)
+    pizza_size = Column(ChoiceType(choices=PizzaSizes, impl=String()), primary_key=True)
+    orders_placed = Column(Integer, nullable=False, default=0)
+    pizzas_ordered = Column(Integer, nullable=False, default=0)
+    orders_cancelled = Column(Integer, nullable=False, default=0)
+    pizzas_cancelled = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<OrderDailyStats {self.day} {self.pizza_size}>"
@@ -1,12 +1,38 @@
+import asyncio
+import time
+import orjson
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from redis import asyncio as aioredis
 from datetime import datetime, timezone
 from config_loader import Config
+from utils.cache import TTLCache
+from utils.batching import MicroBatcher
+from utils.metrics import timed_stage
 
 
-redis_client = aioredis.from_url(
-    url=f"redis://{Config.REDIS_HOST}:{Config.REDIS_PORT}",
-    decode_responses=True,
-)
+def create_redis_client() -> aioredis.Redis:
+    if Config.REDIS_USE_FAKE:
+        # Offline/test mode: an in-process Redis stand-in (requires the 'fakeredis' package)
+        from fakeredis import aioredis as fake_aioredis
+
+        return fake_aioredis.FakeRedis(decode_responses=True)
+    # Blocking pool: when every connection is busy, callers wait up to REDIS_POOL_TIMEOUT instead of failing
+    connection_pool = aioredis.BlockingConnectionPool.from_url(
+        url=f"redis://{Config.REDIS_HOST}:{Config.REDIS_PORT}",
+        decode_responses=True,
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        timeout=Config.REDIS_POOL_TIMEOUT,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return aioredis.Redis(connection_pool=connection_pool)
+
+
+redis_client = create_redis_client()
+
+REVOCATION_CHANNEL = "revocations"
+ORDER_EVENTS_CHANNEL = "order-events"
 
 
 async def test_redis_connection() -> None:
@@ -17,6 +43,18 @@ async def test_redis_connection() -> None:
         print(f"Encountered an error with Redis: {str(e)}")
 
 
+async def iter_pubsub_messages(pubsub: aioredis.client.PubSub) -> AsyncIterator[dict]:
+    # Used instead of pubsub.listen(), whose reads are bound by the pool's socket_timeout and so raise on any
+    # channel that stays quiet for a few seconds. A poll that times out here just means the channel was idle;
+    # a dead connection is still caught by the health check PING sent every REDIS_HEALTH_CHECK_INTERVAL.
+    while True:
+        message = await pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=max(Config.REDIS_HEALTH_CHECK_INTERVAL, 1)
+        )
+        if message is not None and message["type"] == "message":
+            yield message
+
+
 async def close_redis_connection() -> None:
     try:
         await redis_client.aclose(close_connection_pool=True)
@@ -25,14 +63,525 @@ async def close_redis_connection() -> None:
         print(f"Encountered an error while closing Redis: {str(e)}")
 
 
+# -----------------------------------
+# ----- Local Revocation Filter -----
+
+
+class RevocationFilter:
+    # Per-worker copy of revoked jtis and per-user "revoked before" watermarks, kept in sync through Redis pub/sub.
+    # While synced, a token matching neither is definitely not revoked.
+    def __init__(self, prune_interval: float = 60.0):
+        self.prune_interval = prune_interval
+        self.ready = False
+        self._revoked: dict[str, float] = {}
+        self._watermarks: dict[str, tuple[float, float]] = {}
+        self._last_prune = time.time()
+        self._listener: Optional[asyncio.Task] = None
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._revoked[jti] = expires_at
+        self._prune()
+
+    def add_watermark(self, user_id: str, revoked_before: float, expires_at: float) -> None:
+        current = self._watermarks.get(user_id)
+        if current is None or current[0] < revoked_before:
+            self._watermarks[user_id] = (revoked_before, expires_at)
+        self._prune()
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._last_prune >= self.prune_interval:
+            self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+            self._watermarks = {key: value for key, value in self._watermarks.items() if value[1] > now}
+            self._last_prune = now
+
+    def might_be_revoked(self, jti: str, user_id: str, issued_at: float) -> bool:
+        if not self.ready or jti in self._revoked:
+            return True
+        watermark = self._watermarks.get(user_id)
+        return watermark is not None and issued_at < watermark[0]
+
+    async def _load_existing(self) -> None:
+        keys = [key async for key in redis_client.scan_iter(match="revoked:*", count=1000)]
+        watermark_keys = [key async for key in redis_client.scan_iter(match="revoked-before:*", count=1000)]
+        if not (keys or watermark_keys):
+            return
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+            for key in watermark_keys:
+                pipe.get(key)
+                pipe.ttl(key)
+            replies = await pipe.execute()
+        now = time.time()
+        for key, ttl in zip(keys, replies[: len(keys)]):
+            if ttl and ttl > 0:
+                self.add(key.removeprefix("revoked:"), now + ttl)
+        watermark_replies = replies[len(keys) :]
+        for key, revoked_before, ttl in zip(watermark_keys, watermark_replies[::2], watermark_replies[1::2]):
+            if revoked_before is not None and ttl and ttl > 0:
+                self.add_watermark(key.removeprefix("revoked-before:"), float(revoked_before), now + ttl)
+
+    def _handle_message(self, data: str) -> None:
+        # "token:<jti>:<expires_at>" or "user:<user_id>:<revoked_before>:<expires_at>"
+        kind, _, rest = data.partition(":")
+        if kind == "token":
+            jti, expires_at = rest.split(":")
+            self.add(jti, float(expires_at))
+        elif kind == "user":
+            user_id, revoked_before, expires_at = rest.split(":")
+            self.add_watermark(user_id, float(revoked_before), float(expires_at))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    # Subscribe before the snapshot so no revocation falls in between
+                    await self._load_existing()
+                    self.ready = True
+                    async for message in iter_pubsub_messages(pubsub):
+                        self._handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Revocation filter lost its Redis subscription: {str(e)}")
+            self.ready = False
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if Config.REVOCATION_NEAR_CACHE and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self.ready = False
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+REVOCATION_FILTER = RevocationFilter()
+
+# No token outlives a refresh token, so per-user session data never needs to be kept longer than this
+MAX_TOKEN_LIFETIME = Config.REFRESH_TOKEN_EXP * 3600
+
+
+async def blacklist_tokens(tokens: list[tuple[str, int]]) -> None:
+    # Revokes many (jti, auto_expiry_timestamp) pairs in a single pipelined round trip
+    if not tokens:
+        return
+    now = int(datetime.now(timezone.utc).timestamp())
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for jti, auto_expiry_timestamp in tokens:
+            pipe.setex(
+                name=f"revoked:{jti}",
+                time=max(1, auto_expiry_timestamp - now),  # removed from redis after token auto-expires
+                value="true",
+            )
+            pipe.publish(REVOCATION_CHANNEL, f"token:{jti}:{auto_expiry_timestamp}")
+        await pipe.execute()
+    for jti, auto_expiry_timestamp in tokens:
+        REVOCATION_FILTER.add(jti, auto_expiry_timestamp)
+
+
 async def blacklist_token(jti: str, auto_expiry_timestamp: int) -> None:
-    ttl = max(1, (auto_expiry_timestamp - int(datetime.now(timezone.utc).timestamp())))
-    await redis_client.setex(
-        name=f"revoked:{jti}",
-        time=ttl,  # removed from redis after token auto-expires
-        value="true",
-    )
+    await blacklist_tokens([(jti, auto_expiry_timestamp)])
+
+
+# ----------------------------------
+# ----- Per-User Session Index -----
+
+
+async def register_sessions(user_id: str, sessions: list[tuple[str, int]]) -> None:
+    # Indexes issued (jti, exp) pairs under the user, pruning members that have already expired
+    key = f"sessions:{user_id}"
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zadd(key, {jti: auto_expiry_timestamp for jti, auto_expiry_timestamp in sessions})
+        pipe.zremrangebyscore(key, "-inf", int(time.time()))
+        pipe.expire(key, MAX_TOKEN_LIFETIME)
+        await pipe.execute()
+
+
+async def list_active_sessions(user_id: str) -> list[tuple[str, int]]:
+    members = await redis_client.zrangebyscore(f"sessions:{user_id}", int(time.time()), "+inf", withscores=True)
+    return [(jti, int(auto_expiry_timestamp)) for jti, auto_expiry_timestamp in members]
+
+
+async def revoke_all_sessions(user_id: str) -> None:
+    # One watermark write invalidates every token issued to the user so far, however many there are
+    revoked_before = time.time()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(f"revoked-before:{user_id}", revoked_before, ex=MAX_TOKEN_LIFETIME)
+        pipe.delete(f"sessions:{user_id}")
+        pipe.publish(REVOCATION_CHANNEL, f"user:{user_id}:{revoked_before}:{revoked_before + MAX_TOKEN_LIFETIME}")
+        await pipe.execute()
+    REVOCATION_FILTER.add_watermark(user_id, revoked_before, revoked_before + MAX_TOKEN_LIFETIME)
+
+
+async def fetch_revocation_flags(tokens: list[tuple[str, str, float]]) -> list[bool]:
+    keys = []
+    for jti, user_id, _ in tokens:
+        keys.extend((f"revoked:{jti}", f"revoked-before:{user_id}"))
+    values = await redis_client.mget(keys)
+    return [
+        revoked == "true" or (revoked_before is not None and issued_at < float(revoked_before))
+        for (_, _, issued_at), revoked, revoked_before in zip(tokens, values[::2], values[1::2])
+    ]
+
+
+# Lookups that get past the local filter within the same event-loop tick share one MGET
+REVOCATION_LOOKUP_BATCHER = MicroBatcher(
+    flush_func=fetch_revocation_flags,
+    max_batch_size=Config.REDIS_LOOKUP_BATCH_SIZE,
+    max_delay=0,
+)
+
+
+@timed_stage("revocation_check")
+async def is_token_revoked(jti: str, user_id: str, issued_at: float) -> bool:
+    # Covers both a blacklisted jti and a "revoke all sessions" watermark newer than the token
+    if not REVOCATION_FILTER.might_be_revoked(jti, user_id, issued_at):
+        return False
+    return await REVOCATION_LOOKUP_BATCHER.submit((jti, user_id, issued_at))
+
+
+# ------------------------------
+# ----- User Profile Cache -----
+
+
+# Short-lived per-worker tier in front of Redis; other workers' local copies may lag an update by its TTL
+PROFILE_LOCAL_CACHE = TTLCache(max_size=Config.PROFILE_LOCAL_CACHE_SIZE, default_ttl=Config.PROFILE_LOCAL_CACHE_TTL)
+_profile_loads: dict[str, asyncio.Task] = {}
+
+# Caches a freshly loaded profile only if no invalidation happened since the load started, so a slow load
+# can't put a profile that predates an update back into the cache.
+# KEYS: profile key, generation key; ARGV: generation seen before loading, profile JSON, TTL in seconds.
+PROFILE_SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+PROFILE_SET_IF_CURRENT = redis_client.register_script(PROFILE_SET_SCRIPT)
+
+
+async def _read_through_profile(username: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    key, generation_key = f"profile:{username}", f"profile-gen:{username}"
+    cached, generation = await redis_client.mget(key, generation_key)
+    if cached is None:
+        # Only one worker rebuilds an expired profile; the rest wait briefly for it to appear
+        lock_key = f"profile-lock:{username}"
+        acquired = await redis_client.set(lock_key, "1", nx=True, px=Config.PROFILE_CACHE_LOCK_MS)
+        if not acquired:
+            for _ in range(10):
+                await asyncio.sleep(Config.PROFILE_CACHE_LOCK_MS / 10000)
+                cached = await redis_client.get(key)
+                if cached is not None:
+                    break
+        if cached is None:
+            stored = False
+            try:
+                profile = await loader()
+                if profile is not None:
+                    stored = await PROFILE_SET_IF_CURRENT(
+                        keys=[key, generation_key],
+                        args=[generation or "0", orjson.dumps(profile).decode(), Config.PROFILE_CACHE_TTL],
+                    )
+            finally:
+                if acquired:
+                    await redis_client.delete(lock_key)
+            # A profile invalidated mid-load is still returned to this caller, just not cached anywhere
+            if stored:
+                PROFILE_LOCAL_CACHE.set(username, profile)
+            return profile
+    profile = orjson.loads(cached)
+    PROFILE_LOCAL_CACHE.set(username, profile)
+    return profile
+
+
+async def get_cached_profile(username: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    profile = PROFILE_LOCAL_CACHE.get(username)
+    if profile is not None:
+        return profile
+    # Concurrent misses for the same user in this worker share a single load
+    load = _profile_loads.get(username)
+    if load is None:
+        load = asyncio.ensure_future(_read_through_profile(username, loader))
+        _profile_loads[username] = load
+        load.add_done_callback(lambda _: _profile_loads.pop(username, None))
+    return await asyncio.shield(load)
+
+
+async def invalidate_cached_profile(username: str) -> None:
+    # Bumping the generation makes loads already in flight discard their result; the generation key only
+    # has to outlive such loads, so it expires with the profile TTL
+    PROFILE_LOCAL_CACHE.delete(username)
+    generation_key = f"profile-gen:{username}"
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, Config.PROFILE_CACHE_TTL)
+        pipe.delete(f"profile:{username}")
+        await pipe.execute()
+
+
+# --------------------------------------
+# ----- Rate Limit Sliding Windows -----
+
+
+async def hit_sliding_windows(windows: list[tuple[str, int, int]]) -> float:
+    # Counts one hit against every (key, limit, window_seconds) in a single pipelined round trip.
+    # Sliding window counter: the previous fixed window is weighted by how much of it still overlaps.
+    # Returns 0 when all windows allow the hit, otherwise the seconds until the tightest one frees up.
+    now = time.time()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key, _, window in windows:
+            current_window = int(now // window)
+            pipe.incr(f"ratelimit:{key}:{current_window}")
+            pipe.expire(f"ratelimit:{key}:{current_window}", window * 2)
+            pipe.get(f"ratelimit:{key}:{current_window - 1}")
+        results = await pipe.execute()
+    retry_after = 0.0
+    for (_, limit, window), current, previous in zip(windows, results[::3], results[2::3]):
+        elapsed = (now % window) / window
+        estimate = int(previous or 0) * (1 - elapsed) + current
+        if estimate > limit:
+            retry_after = max(retry_after, window * (1 - elapsed))
+    return retry_after
+
+
+# -------------------------------
+# ----- Order Status Events -----
+
+
+class OrderEventSubscription:
+    # One connected client. The queue is bounded: when the client falls behind, its oldest events are dropped
+    # (each event carries the order's full current status, so a later one supersedes an earlier one)
+    def __init__(self, user_id: Optional[str], max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def push(self, event: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class OrderEventHub:
+    # One Redis subscription per worker, fanned out in-process to every connected client.
+    # Delivery never awaits a client, so a slow consumer can't hold up the others.
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._by_user: dict[str, set[OrderEventSubscription]] = {}
+        self._all_orders: set[OrderEventSubscription] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: Optional[str] = None) -> OrderEventSubscription:
+        # user_id=None receives every order's events (staff), otherwise only that user's orders
+        self.start()
+        subscription = OrderEventSubscription(user_id=user_id, max_queue=self.max_queue)
+        if user_id is None:
+            self._all_orders.add(subscription)
+        else:
+            self._by_user.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: OrderEventSubscription) -> None:
+        self.dropped += subscription.dropped
+        if subscription.user_id is None:
+            self._all_orders.discard(subscription)
+            return
+        user_subscriptions = self._by_user.get(subscription.user_id)
+        if user_subscriptions is not None:
+            user_subscriptions.discard(subscription)
+            if not user_subscriptions:
+                del self._by_user[subscription.user_id]
+
+    def dispatch(self, event: dict) -> None:
+        for subscription in (*self._all_orders, *self._by_user.get(event["user_id"], ())):
+            subscription.push(event)
+            self.delivered += 1
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(ORDER_EVENTS_CHANNEL)
+                    async for message in iter_pubsub_messages(pubsub):
+                        self.dispatch(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Order event hub lost its Redis subscription: {str(e)}")
+            await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": len(self._all_orders) + sum(len(subs) for subs in self._by_user.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped
+            + sum(sub.dropped for sub in self._all_orders)
+            + sum(sub.dropped for subs in self._by_user.values() for sub in subs),
+        }
+
+
+ORDER_EVENT_HUB = OrderEventHub(max_queue=Config.ORDER_EVENTS_CLIENT_QUEUE_SIZE)
+
+
+async def publish_order_events(events: list[dict]) -> None:
+    # Called by the outbox relay, which retries the batch if this raises
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.publish(ORDER_EVENTS_CHANNEL, orjson.dumps(event))
+        await pipe.execute()
+
+
+# ----------------------------------
+# ----- Kitchen Dispatch Queue -----
+
+# Every script touches only the queue's own keys, so each claim/ack/requeue is a single atomic step
+KITCHEN_ENQUEUE_SCRIPT = """
+if redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+return redis.call('ZADD', KEYS[1], 'NX', ARGV[2], ARGV[1])
+"""
+
+# Requeues claims whose lease ran out, then pops the best ready orders and leases them to the consumer
+KITCHEN_CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+for _, order_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], order_id)
+    redis.call('HDEL', KEYS[4], order_id)
+    local priority = redis.call('HGET', KEYS[3], order_id)
+    if priority then
+        redis.call('ZADD', KEYS[1], priority, order_id)
+    end
+end
+local popped = redis.call('ZPOPMIN', KEYS[1], ARGV[4])
+local claimed = {}
+for i = 1, #popped, 2 do
+    redis.call('ZADD', KEYS[2], ARGV[2] + ARGV[3], popped[i])
+    redis.call('HSET', KEYS[4], popped[i], ARGV[1])
+    table.insert(claimed, popped[i])
+end
+return {claimed, #expired}
+"""
+
+# Acknowledge (done) or extend (heartbeat) a claim; both only succeed for the consumer holding it
+KITCHEN_ACK_SCRIPT = """
+if redis.call('HGET', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return 1
+"""
+
+KITCHEN_EXTEND_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+
+class KitchenQueue:
+    # Redis-side work queue for open orders, shared by all kitchen terminals (the consumers of one group):
+    #   {name}:ready    zset  order_id -> priority (lower is served first)
+    #   {name}:claimed  zset  order_id -> lease deadline
+    #   {name}:priority hash  order_id -> priority, kept until the order is acknowledged or removed
+    #   {name}:owners   hash  order_id -> consumer holding the claim
+    # Claims live in Redis only, so terminals never contend for row locks on the orders table.
+    def __init__(self, name: str, lease_seconds: float):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.ready_key = f"{name}:ready"
+        self.claimed_key = f"{name}:claimed"
+        self.priority_key = f"{name}:priority"
+        self.owners_key = f"{name}:owners"
+        self._enqueue = redis_client.register_script(KITCHEN_ENQUEUE_SCRIPT)
+        self._claim = redis_client.register_script(KITCHEN_CLAIM_SCRIPT)
+        self._ack = redis_client.register_script(KITCHEN_ACK_SCRIPT)
+        self._extend = redis_client.register_script(KITCHEN_EXTEND_SCRIPT)
+        self.reclaimed = 0
+
+    async def enqueue(self, orders: list[tuple[str, float]]) -> None:
+        # Idempotent for (order_id, priority) pairs: an order already waiting or claimed is left as it is
+        if not orders:
+            return
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for order_id, priority in orders:
+                await self._enqueue(
+                    keys=[self.ready_key, self.claimed_key, self.priority_key], args=[order_id, priority], client=pipe
+                )
+            await pipe.execute()
+
+    async def claim(self, consumer: str, count: int = 1) -> list[str]:
+        claimed, reclaimed = await self._claim(
+            keys=[self.ready_key, self.claimed_key, self.priority_key, self.owners_key],
+            args=[consumer, time.time(), self.lease_seconds, count],
+        )
+        self.reclaimed += reclaimed
+        return claimed
+
+    async def acknowledge(self, order_id: str, consumer: str) -> bool:
+        return bool(
+            await self._ack(keys=[self.claimed_key, self.priority_key, self.owners_key], args=[order_id, consumer])
+        )
+
+    async def holds(self, order_id: str, consumer: str) -> bool:
+        return await redis_client.hget(self.owners_key, order_id) == consumer
+
+    async def extend(self, order_id: str, consumer: str) -> bool:
+        return bool(
+            await self._extend(
+                keys=[self.claimed_key, self.owners_key], args=[order_id, consumer, time.time() + self.lease_seconds]
+            )
+        )
+
+    async def remove(self, order_ids: list[str]) -> None:
+        # For orders that left the kitchen's scope (prepared, cancelled, deleted)
+        if not order_ids:
+            return
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.ready_key, *order_ids)
+            pipe.zrem(self.claimed_key, *order_ids)
+            pipe.hdel(self.priority_key, *order_ids)
+            pipe.hdel(self.owners_key, *order_ids)
+            await pipe.execute()
+
+    async def get_stats(self) -> dict:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zcard(self.ready_key)
+            pipe.zcard(self.claimed_key)
+            pipe.zcount(self.claimed_key, "-inf", time.time())
+            ready, claimed, stale = await pipe.execute()
+        return {"ready": ready, "claimed": claimed, "stale_claims": stale, "reclaimed": self.reclaimed}
 
 
-async def is_blacklisted(jti: str) -> bool:
-    return await redis_client.get(name=f"revoked:{jti}") == "true"
+KITCHEN_QUEUE = KitchenQueue(name="kitchen", lease_seconds=Config.KITCHEN_CLAIM_LEASE_SECONDS)
@@ -0,0 +1,238 @@
+# Bulk user import/export straight against Postgres, bypassing the HTTP API.
+#   python manage_users.py import users.csv [--format csv|ndjson] [--batch-size 5000] [--workers 8]
+#   python manage_users.py export [-o users.csv] [--format csv|ndjson] [--include-password-hash]
+# Import columns: username, password (or an existing bcrypt 'password_hash'), and optionally email, role,
+# is_verified, is_active. Rows are validated, hashed in a process pool, COPYed into a temporary staging
+# table and moved into users with INSERT ... ON CONFLICT DO NOTHING; rows that hit a conflict are reported.
+import argparse
+import csv
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterator, Optional, TextIO
+import orjson
+import psycopg
+from pydantic import ValidationError
+
+from api.models import SignUpModel
+from database.init_db import database_url
+from database.models import User, Roles
+from utils.auth_utils import generate_password_hash, PWD_CONTEXT
+
+IMPORT_COLUMNS = ("id", "username", "email", "password", "role", "is_verified", "is_active", "created_at")
+EXPORT_COLUMNS = ("id", "username", "email", "role", "is_verified", "is_active", "created_at")
+USERNAME_MAX_LENGTH = User.__table__.c.username.type.length
+EMAIL_MAX_LENGTH = User.__table__.c.email.type.length
+ROLE_VALUES = {role.value for role in Roles}
+
+STAGING_TABLE_SQL = """
+CREATE TEMP TABLE user_import_staging (
+    line_no integer NOT NULL,
+    id uuid NOT NULL,
+    username varchar NOT NULL,
+    email varchar,
+    password varchar NOT NULL,
+    role varchar NOT NULL,
+    is_verified boolean NOT NULL,
+    is_active boolean NOT NULL,
+    created_at timestamptz NOT NULL
+) ON COMMIT DROP
+"""
+
+MOVE_STAGED_USERS_SQL = f"""
+INSERT INTO users ({", ".join(IMPORT_COLUMNS)})
+SELECT {", ".join(IMPORT_COLUMNS)} FROM user_import_staging ORDER BY line_no
+ON CONFLICT DO NOTHING
+RETURNING id
+"""
+
+# For the staged rows that weren't inserted: which unique value was already taken (or repeated in the file)
+CONFLICT_REASONS_SQL = """
+SELECT staged.line_no, staged.username,
+       CASE WHEN EXISTS (SELECT 1 FROM users WHERE users.username = staged.username AND users.id <> staged.id)
+            THEN 'username taken' ELSE 'email taken' END
+FROM user_import_staging AS staged
+WHERE staged.id <> ALL(%s)
+ORDER BY staged.line_no
+"""
+
+
+def get_conninfo() -> str:
+    return database_url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def read_rows(source: TextIO, file_format: str) -> Iterator[tuple[int, dict | str]]:
+    # Yields (line number, raw row) without loading the whole file; a row that can't be parsed is yielded
+    # as the reason string instead, so it's reported as invalid without stopping the import
+    if file_format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            # DictReader collects cells beyond the header under the key None
+            yield reader.line_num, row if None not in row else f"{len(row[None])} more fields than the header"
+        return
+    for line_no, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_no, f"not valid JSON ({str(e)})"
+            continue
+        yield line_no, row if isinstance(row, dict) else "not a JSON object"
+
+
+def is_password_hash(value) -> bool:
+    # identify() only looks at the prefix; from_string() also checks the salt and checksum are well formed
+    if not isinstance(value, str) or PWD_CONTEXT.identify(value) is None:
+        return False
+    try:
+        PWD_CONTEXT.handler().from_string(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_row(raw_row: dict) -> tuple[Optional[dict], Optional[str]]:
+    # Returns (row, None) or (None, reason); empty CSV cells fall back to the model defaults
+    raw_row = {key: value for key, value in raw_row.items() if value not in ("", None)}
+    password_hash = raw_row.pop("password_hash", None)
+    if password_hash is not None:
+        # Taken as is, so it must be a hash verify_password can check; it replaces any plaintext password
+        if not is_password_hash(password_hash):
+            return None, "password_hash is not a bcrypt hash"
+        raw_row["password"] = password_hash
+    raw_row.setdefault("role", Roles.USER.value)
+    try:
+        user = SignUpModel(**raw_row)
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    if len(user.username) > USERNAME_MAX_LENGTH:
+        return None, f"username is longer than {USERNAME_MAX_LENGTH} characters"
+    if user.email and len(user.email) > EMAIL_MAX_LENGTH:
+        return None, f"email is longer than {EMAIL_MAX_LENGTH} characters"
+    if user.role not in ROLE_VALUES:
+        return None, f"role must be one of: {', '.join(sorted(ROLE_VALUES))}"
+    row = user.model_dump()
+    row["hashed"] = password_hash is not None
+    return row, None
+
+
+def hash_passwords(executor: ProcessPoolExecutor, rows: list[dict]) -> None:
+    to_hash = [row for row in rows if not row["hashed"]]
+    hashes = executor.map(generate_password_hash, [row["password"] for row in to_hash], chunksize=8)
+    for row, password_hash in zip(to_hash, hashes):
+        row["password"] = password_hash
+
+
+def import_batch(conn: psycopg.Connection, batch: list[tuple[int, dict]]) -> list[tuple[int, str, str]]:
+    # One transaction per batch; returns the conflicting rows as (line number, username, reason)
+    now = datetime.now(timezone.utc)
+    staged_ids = []
+    with conn.transaction(), conn.cursor() as cursor:
+        cursor.execute(STAGING_TABLE_SQL)
+        with cursor.copy(f"COPY user_import_staging (line_no, {', '.join(IMPORT_COLUMNS)}) FROM STDIN") as copy:
+            for line_no, row in batch:
+                user_id = uuid.uuid4()
+                staged_ids.append(user_id)
+                copy.write_row(
+                    (
+                        line_no,
+                        user_id,
+                        row["username"],
+                        row["email"],
+                        row["password"],
+                        row["role"],
+                        row["is_verified"],
+                        row["is_active"],
+                        now,
+                    )
+                )
+        inserted_ids = [inserted_id for (inserted_id,) in cursor.execute(MOVE_STAGED_USERS_SQL).fetchall()]
+        if len(inserted_ids) == len(staged_ids):
+            return []
+        return cursor.execute(CONFLICT_REASONS_SQL, (inserted_ids,)).fetchall()
+
+
+def run_import(path: str, file_format: str, batch_size: int, workers: Optional[int]) -> int:
+    start = time.perf_counter()
+    read = inserted = invalid = conflicts = 0
+    with open(path, newline="") as source, psycopg.connect(get_conninfo()) as conn, ProcessPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        rows = read_rows(source, file_format)
+        while True:
+            batch = []
+            for line_no, raw_row in rows:
+                read += 1
+                row, reason = validate_row(raw_row) if isinstance(raw_row, dict) else (None, raw_row)
+                if row is None:
+                    invalid += 1
+                    print(f"line {line_no}: invalid - {reason}", file=sys.stderr)
+                    continue
+                batch.append((line_no, row))
+                if len(batch) >= batch_size:
+                    break
+            if not batch:
+                break
+            hash_passwords(executor, [row for _, row in batch])
+            batch_conflicts = import_batch(conn, batch)
+            for line_no, username, reason in batch_conflicts:
+                print(f"line {line_no}: conflict - {reason} ('{username}')", file=sys.stderr)
+            conflicts += len(batch_conflicts)
+            inserted += len(batch) - len(batch_conflicts)
+            print(f"{read} rows read, {inserted} users created so far...")
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done in {elapsed:.1f}s: {read} rows read, {inserted} users created, "
+        f"{conflicts} conflicts, {invalid} invalid ({read / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return 0 if not (conflicts or invalid) else 1
+
+
+def run_export(output: TextIO, file_format: str, include_password_hash: bool) -> int:
+    columns = EXPORT_COLUMNS + (("password AS password_hash",) if include_password_hash else ())
+    query = f"SELECT {', '.join(columns)} FROM users ORDER BY created_at, id"
+    with psycopg.connect(get_conninfo()) as conn:
+        if file_format == "csv":
+            # Postgres formats the CSV itself; rows are streamed through in blocks as they're produced
+            with conn.cursor().copy(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+                for block in copy:
+                    output.write(bytes(block).decode())
+            return 0
+        # Named (server-side) cursor: rows are fetched in chunks of 'itersize', never the whole table
+        with conn.cursor(name="user_export") as cursor:
+            cursor.itersize = 2000
+            cursor.execute(query)
+            names = [column.name for column in cursor.description]
+            for record in cursor:
+                output.write(orjson.dumps(dict(zip(names, record))).decode() + "\n")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import and export of users.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="create users from a CSV or NDJSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=("csv", "ndjson"), default=None, help="defaults to the extension")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: CPU count)")
+    export_parser = subparsers.add_parser("export", help="write all users as CSV or NDJSON")
+    export_parser.add_argument("-o", "--output", default="-", help="file path, or - for stdout")
+    export_parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    export_parser.add_argument("--include-password-hash", action="store_true", help="for moving accounts")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        file_format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+        return run_import(args.path, file_format, args.batch_size, args.workers)
+    if args.output == "-":
+        return run_export(sys.stdout, args.format, args.include_password_hash)
+    with open(args.output, "w", newline="") as output:
+        return run_export(output, args.format, args.include_password_hash)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
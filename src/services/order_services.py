@@ -0,0 +1,525 @@
+import asyncio
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import delete, func, insert, literal_column, select, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import RedisError
+from config_loader import Config
+from database.db_session import AsyncSessionLocal
+from database.models import Order, OrderDailyStats, OrderEvent, OrderStatuses, PizzaSizes, OPEN_ORDERS_PREDICATE
+from database.redis import publish_order_events, KITCHEN_QUEUE
+from api.models import PlaceOrderModel
+from utils.batching import MicroBatcher
+from utils.metrics import METRICS
+from utils.query_builder import build_cached_select_query
+from utils.pagination import encode_keyset_cursor, build_keyset_filter
+
+ORDER_KEYSET_ORDER = [("time_of_order", 1), ("id", 1)]
+
+# Allowed next statuses for each status; delivered and cancelled are terminal
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatuses.RECEIVED: {OrderStatuses.PREPARED, OrderStatuses.CANCELLED},
+    OrderStatuses.PREPARED: {OrderStatuses.IN_TRANSIT, OrderStatuses.CANCELLED},
+    OrderStatuses.IN_TRANSIT: {OrderStatuses.DELIVERED},
+    OrderStatuses.DELIVERED: set(),
+    OrderStatuses.CANCELLED: set(),
+}
+
+# Kitchen priority: oldest first, with bigger orders pulled forward by their extra preparation time
+# so that orders come out of the kitchen roughly in the order they were placed
+PIZZA_SIZE_PREP_SECONDS = {
+    PizzaSizes.SMALL: 0,
+    PizzaSizes.MEDIUM: 60,
+    PizzaSizes.LARGE: 120,
+    PizzaSizes.EXTRA_LARGE: 180,
+}
+EXTRA_PIZZA_PREP_SECONDS = 45
+MAX_EXTRA_PIZZAS_CREDITED = 10
+
+
+def get_kitchen_priority(time_of_order: datetime, pizza_size: PizzaSizes, quantity: int) -> float:
+    extra_pizzas = min(max(quantity - 1, 0), MAX_EXTRA_PIZZAS_CREDITED)
+    return time_of_order.timestamp() - PIZZA_SIZE_PREP_SECONDS[pizza_size] - EXTRA_PIZZA_PREP_SECONDS * extra_pizzas
+
+
+async def sync_kitchen_queue() -> None:
+    # Queues every order still waiting for the kitchen (idempotent, so every worker may run it on startup)
+    async with AsyncSessionLocal() as session:
+        statement, params = build_cached_select_query(
+            model=Order, where_filter={"order_status": OrderStatuses.RECEIVED}
+        )
+        result = await session.execute(statement, params)
+        orders = result.scalars().all()
+    try:
+        await KITCHEN_QUEUE.enqueue(
+            [
+                (str(order.id), get_kitchen_priority(order.time_of_order, order.pizza_size, order.quantity))
+                for order in orders
+            ]
+        )
+    except Exception as e:
+        print(f"Encountered the following error while syncing the kitchen queue: {str(e)}")
+
+
+# -------------------------------
+# ----- Order Events Outbox -----
+
+
+def build_order_event_row(order, deleted: bool = False) -> dict:
+    # 'order' is an Order or a row dict about to be inserted as one
+    get = order.get if isinstance(order, dict) else lambda key: getattr(order, key)
+    payload = {
+        "quantity": get("quantity"),
+        "pizza_size": get("pizza_size").value,
+        "time_of_order": get("time_of_order").isoformat(),
+    }
+    if deleted:
+        payload["deleted"] = True  # the order row is gone; order_status is its last status
+    return {
+        "order_id": get("id"),
+        "user_id": get("user_id"),
+        "order_status": get("order_status"),
+        "payload": payload,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def is_kitchen_event(event: OrderEvent) -> bool:
+    # Only received orders that still exist belong in the kitchen queue
+    return event.order_status == OrderStatuses.RECEIVED and not event.payload.get("deleted", False)
+
+
+ORDER_EVENTS_RELAYED = METRICS.counter("order_events_relayed_total", "Outbox events published by the relay.")
+ORDER_EVENT_RELAY_FAILURES = METRICS.counter("order_event_relay_failures_total", "Outbox batches that failed.")
+ORDER_EVENT_RELAY_BATCH = METRICS.histogram("order_event_relay_batch_seconds", "Time to relay one outbox batch.")
+ORDER_EVENT_LAG = METRICS.histogram(
+    "order_event_lag_seconds",
+    "Delay between an order change committing and its event being published.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+class OrderEventRelay:
+    # Drains the order_events outbox into Redis: status events for the SSE hub plus kitchen queue updates.
+    # Every worker may run one; FOR UPDATE SKIP LOCKED hands each relay a disjoint batch. Rows are deleted
+    # in the transaction that locked them, after publishing, so delivery is at-least-once.
+    def __init__(self, batch_size: int, poll_interval: float, max_backoff: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._failure_streak = 0
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._events = 0
+        self._failures = 0
+        self._busy_time = 0.0
+
+    def notify(self) -> None:
+        # Called after a local commit so events don't wait for the next poll
+        self._wakeup.set()
+
+    async def drain_batch(self) -> int:
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(OrderEvent).order_by(OrderEvent.id).limit(self.batch_size).with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+            await self.deliver(events)
+            await session.execute(delete(OrderEvent).where(OrderEvent.id.in_([event.id for event in events])))
+            await session.commit()
+        elapsed = time.perf_counter() - start
+        now = datetime.now(timezone.utc)
+        for event in events:
+            created_at = event.created_at if event.created_at.tzinfo else event.created_at.replace(tzinfo=timezone.utc)
+            ORDER_EVENT_LAG.observe((now - created_at).total_seconds())
+        ORDER_EVENT_RELAY_BATCH.observe(elapsed)
+        ORDER_EVENTS_RELAYED.inc(amount=len(events))
+        self._batches += 1
+        self._events += len(events)
+        self._busy_time += elapsed
+        return len(events)
+
+    async def deliver(self, events: list[OrderEvent]) -> None:
+        published_at = time.time()
+        await publish_order_events(
+            [
+                {
+                    "order_id": str(event.order_id),
+                    "user_id": str(event.user_id),
+                    "order_status": event.order_status.value,
+                    "deleted": event.payload.get("deleted", False),
+                    "published_at": published_at,
+                }
+                for event in events
+            ]
+        )
+        # Relays may deliver an order's events out of order; claim_kitchen_orders drops stale entries
+        await KITCHEN_QUEUE.enqueue(
+            [
+                (
+                    str(event.order_id),
+                    get_kitchen_priority(
+                        datetime.fromisoformat(event.payload["time_of_order"]),
+                        PizzaSizes(event.payload["pizza_size"]),
+                        event.payload["quantity"],
+                    ),
+                )
+                for event in events
+                if is_kitchen_event(event)
+            ]
+        )
+        await KITCHEN_QUEUE.remove([str(event.order_id) for event in events if not is_kitchen_event(event)])
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                drained = await self.drain_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failures += 1
+                self._failure_streak += 1
+                ORDER_EVENT_RELAY_FAILURES.inc()
+                if self._failure_streak == 1:
+                    print(f"Encountered the following error while relaying order events: {str(e)}")
+                # Exponential backoff while Redis or Postgres is down; wakeups don't cut it short
+                await asyncio.sleep(min(self.poll_interval * 2**self._failure_streak, self.max_backoff))
+                continue
+            if self._failure_streak:
+                print(f"Order event relay recovered after {self._failure_streak} failed attempts")
+                self._failure_streak = 0
+            if drained < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def get_stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "poll_interval_ms": self.poll_interval * 1000,
+            "batches": self._batches,
+            "events": self._events,
+            "failures": self._failures,
+            "failure_streak": self._failure_streak,
+            "avg_batch_size": (self._events / self._batches) if self._batches else 0.0,
+            "events_per_busy_second": (self._events / self._busy_time) if self._busy_time else 0.0,
+        }
+
+
+ORDER_EVENT_RELAY = OrderEventRelay(
+    batch_size=Config.ORDER_EVENTS_BATCH_SIZE,
+    poll_interval=Config.ORDER_EVENTS_POLL_INTERVAL_MS / 1000,
+    max_backoff=Config.ORDER_EVENTS_MAX_BACKOFF_SECONDS,
+)
+
+
+# -----------------------------
+# ----- Order Daily Stats -----
+
+ORDER_STATS_COUNTERS = ("orders_placed", "pizzas_ordered", "orders_cancelled", "pizzas_cancelled")
+ORDER_STATS_ORDER = [("day", 1), ("pizza_size", 0)]
+
+
+def get_stats_day(time_of_order: datetime) -> date:
+    # Rollup days are UTC days; SQLite hands timestamps back naive, but they were stored as UTC
+    if time_of_order.tzinfo is None:
+        time_of_order = time_of_order.replace(tzinfo=timezone.utc)
+    return time_of_order.astimezone(timezone.utc).date()
+
+
+def count_placed_orders(rows: list[dict]) -> dict:
+    # (day, pizza_size) -> counter increments for a batch of newly inserted order rows
+    increments = {}
+    for row in rows:
+        counters = increments.setdefault((get_stats_day(row["time_of_order"]), row["pizza_size"]), {})
+        counters["orders_placed"] = counters.get("orders_placed", 0) + 1
+        counters["pizzas_ordered"] = counters.get("pizzas_ordered", 0) + row["quantity"]
+    return increments
+
+
+def count_deleted_orders(orders: list[Order]) -> dict:
+    # Negative increments that take deleted orders back out of the rollup
+    increments = {}
+    for order in orders:
+        counters = increments.setdefault((get_stats_day(order.time_of_order), order.pizza_size), {})
+        counters["orders_placed"] = counters.get("orders_placed", 0) - 1
+        counters["pizzas_ordered"] = counters.get("pizzas_ordered", 0) - order.quantity
+        if order.order_status == OrderStatuses.CANCELLED:
+            counters["orders_cancelled"] = counters.get("orders_cancelled", 0) - 1
+            counters["pizzas_cancelled"] = counters.get("pizzas_cancelled", 0) - order.quantity
+    return increments
+
+
+async def add_order_stats(session: AsyncSession, increments: dict) -> None:
+    # One INSERT ... ON CONFLICT DO UPDATE for every touched row, inside the caller's transaction.
+    # Rows are sorted so concurrent batches lock the (day, size) rows they share in the same order.
+    if not increments:
+        return
+    rows = [
+        {"day": day, "pizza_size": pizza_size, **{name: counters.get(name, 0) for name in ORDER_STATS_COUNTERS}}
+        for (day, pizza_size), counters in sorted(increments.items(), key=lambda item: (item[0][0], item[0][1].value))
+    ]
+    statement = pg_insert(OrderDailyStats).values(rows)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[OrderDailyStats.day, OrderDailyStats.pizza_size],
+            set_={name: getattr(OrderDailyStats, name) + statement.excluded[name] for name in ORDER_STATS_COUNTERS},
+        )
+    )
+
+
+async def record_deleted_orders(session: AsyncSession, orders: list[Order]) -> None:
+    # For orders about to be removed with their account; call in the transaction that deletes them.
+    # The outbox tells subscribers and the kitchen, and the rollup drops them so it keeps matching orders.
+    if orders:
+        await session.execute(insert(OrderEvent), [build_order_event_row(order, deleted=True) for order in orders])
+        increments = count_deleted_orders(orders)
+        await add_order_stats(session, increments)
+        # Rows left with no orders are dropped, as a backfill wouldn't produce them
+        await session.execute(
+            delete(OrderDailyStats).where(
+                OrderDailyStats.day.in_({day for day, _ in increments}), OrderDailyStats.orders_placed <= 0
+            )
+        )
+
+
+async def backfill_order_stats(session: AsyncSession, since: Optional[date] = None) -> int:
+    # Rebuilds the rollup from orders (entirely, or from 'since' on) and returns the number of rows written.
+    # On Postgres, orders is locked against writes meanwhile so no increment lands between delete and rebuild.
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        await session.execute(text("LOCK TABLE orders IN SHARE MODE"))
+        order_day = func.date(func.timezone(literal_column("'UTC'"), Order.time_of_order))
+    else:
+        order_day = func.date(Order.time_of_order)
+    cancelled = Order.order_status == OrderStatuses.CANCELLED
+    aggregate = select(
+        order_day,
+        Order.pizza_size,
+        func.count(),
+        func.sum(Order.quantity),
+        func.count().filter(cancelled),
+        func.coalesce(func.sum(Order.quantity).filter(cancelled), 0),
+    ).group_by(order_day, Order.pizza_size)
+    clear = delete(OrderDailyStats)
+    if since is not None:
+        # On the raw timestamp rather than the computed day, so the range can use an index on time_of_order
+        aggregate = aggregate.where(Order.time_of_order >= datetime.combine(since, datetime.min.time(), timezone.utc))
+        clear = clear.where(OrderDailyStats.day >= since)
+    await session.execute(clear)
+    result = await session.execute(
+        insert(OrderDailyStats).from_select(["day", "pizza_size", *ORDER_STATS_COUNTERS], aggregate)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def insert_order_rows(rows: list[dict]) -> list:
+    # Flush callback of the placement batcher: one multi-row INSERT for the whole batch
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(insert(Order), rows)
+            await session.execute(insert(OrderEvent), [build_order_event_row(row) for row in rows])
+            await add_order_stats(session, count_placed_orders(rows))
+            await session.commit()
+            ORDER_EVENT_RELAY.notify()
+            return rows
+        except IntegrityError:
+            await session.rollback()
+    # A bad row (e.g. the user was deleted meanwhile) fails the batch; retry row by row to isolate it
+    results = []
+    for row in rows:
+        async with AsyncSessionLocal() as session:
+            try:
+                await session.execute(insert(Order), [row])
+                await session.execute(insert(OrderEvent), [build_order_event_row(row)])
+                await add_order_stats(session, count_placed_orders([row]))
+                await session.commit()
+                results.append(row)
+            except IntegrityError as e:
+                await session.rollback()
+                results.append(e)
+    ORDER_EVENT_RELAY.notify()
+    return results
+
+
+ORDER_WRITE_BATCHER = MicroBatcher(
+    flush_func=insert_order_rows,
+    max_batch_size=Config.ORDER_BATCH_MAX_SIZE,
+    max_delay=Config.ORDER_BATCH_MAX_DELAY_MS / 1000,
+)
+
+
+class OrderServices:
+    async def place_order(self, user_id: str, order: PlaceOrderModel) -> Optional[Order]:
+        row = {
+            "id": uuid.uuid4(),
+            "quantity": order.quantity,
+            "order_status": OrderStatuses.RECEIVED,
+            "pizza_size": PizzaSizes(order.pizza_size),
+            "user_id": uuid.UUID(user_id),
+            "time_of_order": datetime.now(timezone.utc),
+        }
+        try:
+            await ORDER_WRITE_BATCHER.submit(row)
+        except IntegrityError:
+            return None
+        return Order(**row)
+
+    async def get_order(self, session: AsyncSession, order_id: uuid.UUID) -> Optional[Order]:
+        statement, params = build_cached_select_query(model=Order, where_filter={"id": order_id})
+        result = await session.execute(statement, params)
+        return result.scalars().first()
+
+    async def get_orders_page(
+        self,
+        session: AsyncSession,
+        where_filter: dict,
+        limit: int,
+        cursor: Optional[str] = None,
+        open_only: bool = False,
+    ) -> tuple[list[Order], Optional[str]]:
+        # Keyset pagination over (time_of_order, id), newest first; raises ValueError for a malformed cursor
+        keyset_filter = build_keyset_filter(cursor, "time_of_order")
+        if keyset_filter:
+            where_filter = {"_and": [where_filter, keyset_filter]} if where_filter else keyset_filter
+        # The open-orders predicate stays a literal (not a bound parameter) so that Postgres can prove it
+        # matches ix_orders_open_time_of_order even under generic plans
+        statement, params = build_cached_select_query(
+            model=Order,
+            where_filter=where_filter,
+            order_by_cols=ORDER_KEYSET_ORDER,
+            limit=limit + 1,
+            literal_predicate=OPEN_ORDERS_PREDICATE if open_only else None,
+        )
+        result = await session.execute(statement, params)
+        db_orders = result.scalars().all()
+        if len(db_orders) <= limit:
+            return db_orders, None
+        last_order = db_orders[limit - 1]
+        return db_orders[:limit], encode_keyset_cursor(last_order.time_of_order, last_order.id)
+
+    async def transition_order(
+        self,
+        session: AsyncSession,
+        order_id: uuid.UUID,
+        new_status: OrderStatuses,
+        allowed_sources: list[OrderStatuses],
+        user_id: Optional[str] = None,
+    ) -> str | Order:
+        # Single conditional UPDATE, so two concurrent transitions can't both apply
+        conditions = [Order.id == order_id, Order.order_status.in_(allowed_sources)]
+        if user_id is not None:
+            conditions.append(Order.user_id == uuid.UUID(user_id))
+        result = await session.execute(
+            update(Order).where(*conditions).values(order_status=new_status).returning(Order)
+        )
+        updated_order = result.scalars().first()
+        if updated_order:
+            # The event commits (or rolls back) with the status change; the relay publishes it
+            await session.execute(insert(OrderEvent), [build_order_event_row(updated_order)])
+            if new_status == OrderStatuses.CANCELLED:
+                stats_key = (get_stats_day(updated_order.time_of_order), updated_order.pizza_size)
+                await add_order_stats(
+                    session, {stats_key: {"orders_cancelled": 1, "pizzas_cancelled": updated_order.quantity}}
+                )
+            await session.commit()
+            ORDER_EVENT_RELAY.notify()
+            return updated_order
+        await session.rollback()
+        existing_order = await self.get_order(session=session, order_id=order_id)
+        if not existing_order or (user_id is not None and str(existing_order.user_id) != user_id):
+            return "ORDER NOT FOUND"
+        return "INVALID TRANSITION"
+
+    async def update_order_status(
+        self, session: AsyncSession, order_id: uuid.UUID, new_status: OrderStatuses
+    ) -> str | Order:
+        allowed_sources = [source for source, targets in ORDER_STATUS_TRANSITIONS.items() if new_status in targets]
+        return await self.transition_order(
+            session=session, order_id=order_id, new_status=new_status, allowed_sources=allowed_sources
+        )
+
+    async def cancel_order(
+        self, session: AsyncSession, order_id: uuid.UUID, user_id: Optional[str] = None
+    ) -> str | Order:
+        if user_id is None:
+            return await self.update_order_status(
+                session=session, order_id=order_id, new_status=OrderStatuses.CANCELLED
+            )
+        # Customers can only cancel their own orders, and only before the kitchen has prepared them
+        return await self.transition_order(
+            session=session,
+            order_id=order_id,
+            new_status=OrderStatuses.CANCELLED,
+            allowed_sources=[OrderStatuses.RECEIVED],
+            user_id=user_id,
+        )
+
+    async def claim_kitchen_orders(self, session: AsyncSession, consumer: str, count: int) -> list[Order]:
+        order_ids = await KITCHEN_QUEUE.claim(consumer=consumer, count=count)
+        if not order_ids:
+            return []
+        result = await session.execute(
+            select(Order).where(Order.id.in_([uuid.UUID(order_id) for order_id in order_ids]))
+        )
+        orders_by_id = {str(order.id): order for order in result.scalars().all()}
+        claimed_orders = []
+        for order_id in order_ids:
+            order = orders_by_id.get(order_id)
+            if order is None or order.order_status != OrderStatuses.RECEIVED:
+                # Cancelled or deleted while it was queued; drop the stale entry instead of handing it out
+                await KITCHEN_QUEUE.remove([order_id])
+                continue
+            claimed_orders.append(order)
+        return claimed_orders
+
+    async def complete_kitchen_order(self, session: AsyncSession, order_id: uuid.UUID, consumer: str) -> str | Order:
+        # The conditional UPDATE in transition_order still guards the row; the claim only decides who may try
+        if not await KITCHEN_QUEUE.holds(str(order_id), consumer):
+            return "CLAIM NOT HELD"
+        result = await self.update_order_status(session=session, order_id=order_id, new_status=OrderStatuses.PREPARED)
+        if isinstance(result, Order):
+            # Release the claim right away rather than when the relay gets to the PREPARED event, so a lagging
+            # relay can't let the lease run out and the order be offered to another terminal
+            try:
+                await KITCHEN_QUEUE.acknowledge(str(order_id), consumer)
+            except RedisError as e:
+                print(f"Encountered the following error while acknowledging a kitchen claim: {str(e)}")
+        return result
+
+    async def get_order_stats(
+        self, session: AsyncSession, start: date, end: date, pizza_size: Optional[PizzaSizes] = None
+    ) -> list[OrderDailyStats]:
+        # Reads the rollup only: at most one row per day and pizza size in the range, newest day first
+        where_filter = {"day__gte": start, "day__lte": end}
+        if pizza_size is not None:
+            where_filter["pizza_size"] = pizza_size
+        statement, params = build_cached_select_query(
+            model=OrderDailyStats, where_filter=where_filter, order_by_cols=ORDER_STATS_ORDER
+        )
+        result = await session.execute(statement, params)
+        return result.scalars().all()
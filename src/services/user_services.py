@@ -1,56 +1,151 @@
-from typing import Optional
+from typing import Optional, AsyncGenerator
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import User
+from database.db_session import AsyncSessionLocal
+from database.models import Order, User
+from database.redis import invalidate_cached_profile
 from api.models import SignUpModel, UpdateModel
-from utils.auth_utils import generate_password_hash
-from utils.query_builder import build_select_query
+from utils.auth_utils import generate_password_hash_async
+from utils.query_builder import build_cached_select_query
+from utils.pagination import encode_keyset_cursor, build_keyset_filter
+from utils.metrics import timed_stage
+from services.order_services import record_deleted_orders, ORDER_EVENT_RELAY
+
+USER_KEYSET_ORDER = [("created_at", 1), ("id", 1)]
+
+# Login/logout hot path: prebuilt once, only the parameters change per call
+SET_USER_STATUS_STATEMENT = (
+    update(User)
+    .where(User.username == bindparam("target_username"))
+    .values(is_active=bindparam("is_active"))
+    .returning(User.id)
+)
 
 
 class UserServices:
+    @timed_stage("user_services.create_user")
     async def create_user(self, session: AsyncSession, user: SignUpModel) -> str:
-        if await self.get_user(session=session, where_filter={"username": user.username}):
-            return "USERNAME TAKEN"
-        if user.email and await self.get_user(session=session, where_filter={"email": user.email}):
-            return "DUPLICATE ACCOUNT"
-        new_user = User(**user.model_dump(exclude={"password"}), password=generate_password_hash(user.password))
-        session.add(new_user)
+        # One INSERT ... ON CONFLICT DO NOTHING RETURNING round trip; unique violations come back as no row
+        password_hash = await generate_password_hash_async(user.password)
+        result = await session.execute(
+            pg_insert(User)
+            .values(**user.model_dump(exclude={"password"}), password=password_hash)
+            .on_conflict_do_nothing()
+            .returning(User.id)
+        )
+        new_user_id = result.scalar_one_or_none()
         await session.commit()
-        return f"User with User ID '{new_user.id}' has been created!"
+        if new_user_id:
+            return f"User with User ID '{new_user_id}' has been created!"
+        # Conflict path only: one lookup to tell which unique constraint was hit
+        where_filter = {"username": user.username}
+        if user.email:
+            where_filter = {"_or": [where_filter, {"email": user.email}]}
+        conflicting_users = await self.get_multiple_users(session=session, where_filter=where_filter)
+        if not user.email or any(db_user.username == user.username for db_user in conflicting_users):
+            return "USERNAME TAKEN"
+        return "DUPLICATE ACCOUNT"
 
+    @timed_stage("user_services.get_user")
     async def get_user(self, session: AsyncSession, where_filter: dict = {}) -> Optional[User]:
-        result = await session.execute(build_select_query(model=User, where_filter=where_filter))
+        statement, params = build_cached_select_query(model=User, where_filter=where_filter)
+        result = await session.execute(statement, params)
         db_user = result.scalars().first()
         return db_user
 
+    @timed_stage("user_services.load_user_profile")
+    async def load_user_profile(self, username: str) -> Optional[dict]:
+        # Cache-miss loader for the profile cache; uses its own session since the load may be shared by requests
+        async with AsyncSessionLocal() as session:
+            db_user = await self.get_user(session=session, where_filter={"username": username})
+        return db_user.to_dict(exclude={"password"}) if db_user else None
+
+    @timed_stage("user_services.get_multiple_users")
     async def get_multiple_users(
         self, session: AsyncSession, where_filter: dict = {}, order_by_cols: list[tuple] = []
     ) -> list[User]:
-        result = await session.execute(
-            build_select_query(model=User, where_filter=where_filter, order_by_cols=order_by_cols)
+        statement, params = build_cached_select_query(
+            model=User, where_filter=where_filter, order_by_cols=order_by_cols
         )
+        result = await session.execute(statement, params)
         db_users = result.scalars().all()
         return db_users
 
+    @timed_stage("user_services.get_users_page")
+    async def get_users_page(
+        self, session: AsyncSession, limit: int, cursor: Optional[str] = None
+    ) -> tuple[list[User], Optional[str]]:
+        # Keyset pagination over (created_at, id); raises ValueError for a malformed cursor
+        statement, params = build_cached_select_query(
+            model=User,
+            where_filter=build_keyset_filter(cursor, "created_at"),
+            order_by_cols=USER_KEYSET_ORDER,
+            limit=limit + 1,
+        )
+        result = await session.execute(statement, params)
+        db_users = result.scalars().all()
+        if len(db_users) <= limit:
+            return db_users, None
+        last_user = db_users[limit - 1]
+        return db_users[:limit], encode_keyset_cursor(last_user.created_at, last_user.id)
+
+    async def stream_users(self, cursor: Optional[str] = None) -> AsyncGenerator[bytes, None]:
+        # Yields NDJSON lines from a server-side cursor; owns its session since it outlives the request handler
+        statement, params = build_cached_select_query(
+            model=User, where_filter=build_keyset_filter(cursor, "created_at"), order_by_cols=USER_KEYSET_ORDER
+        )
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(statement, params, execution_options={"yield_per": 500})
+            async for user in result.scalars():
+                yield user.to_json(exclude={"password"}) + b"\n"
+
     async def update_user(
         self, session: AsyncSession, username: str, update_data: UpdateModel, exclude_status: bool
     ) -> Optional[User]:
-        existing_user = await self.get_user(session=session, where_filter={"username": username})
-        if not existing_user:
-            return None
+        update_values = {}
         # print("Data to be Updated -->", update_data.model_dump())
         for field, value in update_data.model_dump(exclude=({"is_active"} if exclude_status else None)).items():
             if field != "is_active" and not value:
                 continue
             if field == "password":
-                value = generate_password_hash(value)
-            setattr(existing_user, field, value)
+                value = await generate_password_hash_async(value)
+            update_values[field] = value
+        if not update_values:
+            return await self.get_user(session=session, where_filter={"username": username})
+        return await self.update_user_fields(session=session, username=username, update_values=update_values)
+
+    @timed_stage("user_services.update_user_fields")
+    async def update_user_fields(self, session: AsyncSession, username: str, update_values: dict) -> Optional[User]:
+        # Partial update as one UPDATE ... RETURNING, without loading the row first
+        result = await session.execute(
+            update(User).where(User.username == username).values(**update_values).returning(User)
+        )
+        updated_user = result.scalars().first()
+        await session.commit()
+        await invalidate_cached_profile(username)
+        return updated_user
+
+    @timed_stage("user_services.set_user_status")
+    async def set_user_status(self, session: AsyncSession, username: str, is_active: bool) -> bool:
+        result = await session.execute(SET_USER_STATUS_STATEMENT, {"target_username": username, "is_active": is_active})
+        updated_user_id = result.scalar_one_or_none()
         await session.commit()
-        return existing_user
+        await invalidate_cached_profile(username)
+        return updated_user_id is not None
 
+    @timed_stage("user_services.delete_user")
     async def delete_user(self, session: AsyncSession, username: str) -> bool:
         existing_user = await self.get_user(session=session, where_filter={"username": username})
         if not existing_user:
             return False
+        # The account's orders go with it (ON DELETE CASCADE), so their removal is written to the outbox in the
+        # same transaction. Locking the user row first makes concurrent order inserts wait and then fail.
+        await session.execute(select(User.id).where(User.id == existing_user.id).with_for_update())
+        result = await session.execute(select(Order).where(Order.user_id == existing_user.id).with_for_update())
+        await record_deleted_orders(session, result.scalars().all())
         await session.delete(existing_user)
         await session.commit()
+        ORDER_EVENT_RELAY.notify()
+        await invalidate_cached_profile(username)
         return True
@@ -1,15 +1,19 @@
-from typing import Optional
+from typing import Optional, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 from passlib.context import CryptContext
+import asyncio
+import time
 import jwt
 
 # from jwt.exceptions import ExpiredSignatureError, PyJWTError
 from datetime import datetime, timezone, timedelta
 import uuid
-import json
 
 # import traceback
 
 from config_loader import Config
+from utils.jwt_keys import JWTKeySet
+from utils.metrics import timed_stage
 
 
 PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -24,19 +28,143 @@ def verify_password(pwd: str, hash: str) -> bool:
     return PWD_CONTEXT.verify(pwd, hash)
 
 
-def create_token(user_data: dict, refresh_token_flag: bool = False) -> Optional[str]:
-    payload = {}
-    user_data_str = ""
+# ---------------------------------
+# ----- Password Hashing Pool -----
+
+
+class PasswordHashPoolSaturated(Exception):
+    pass
+
+
+class PasswordHashPool:
+    # Runs bcrypt off the event loop; at most (max_workers + max_queue) jobs are admitted at once
+    def __init__(self, max_workers: int, max_queue: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise PasswordHashPoolSaturated("Password hashing pool is saturated.")
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._in_flight -= 1
+            self._completed += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_latency_ms": (self._latency_total / self._completed * 1000) if self._completed else 0.0,
+            "max_latency_ms": self._latency_max * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+PWD_HASH_POOL = PasswordHashPool(
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    max_queue=Config.PASSWORD_HASH_QUEUE_SIZE,
+    use_processes=Config.PASSWORD_HASH_USE_PROCESSES,
+)
+
+
+@timed_stage("password_hash")
+async def generate_password_hash_async(pwd: str) -> str:
+    return await PWD_HASH_POOL.run(generate_password_hash, pwd)
+
+
+@timed_stage("password_verify")
+async def verify_password_async(pwd: str, hash: str) -> bool:
+    return await PWD_HASH_POOL.run(verify_password, pwd, hash)
+
+
+# ----------------------------
+# ----- JWT Signing Keys -----
+
+JWT_KEY_SET = (
+    JWTKeySet(
+        jwks_path=Config.JWT_JWKS_FILE,
+        signing_kid=Config.JWT_SIGNING_KEY_ID,
+        reload_interval=Config.JWT_KEYS_RELOAD_INTERVAL,
+    )
+    if Config.JWT_JWKS_FILE
+    else None
+)
+
+
+def get_signing_params() -> tuple:
+    # Without a JWKS signing key (e.g. on verify-only workers) tokens keep being signed with JWT_SECRET
+    if JWT_KEY_SET is not None and JWT_KEY_SET.signing_key is not None:
+        kid, algorithm, private_key = JWT_KEY_SET.signing_key
+        return private_key, algorithm, {"kid": kid}
+    return Config.JWT_SECRET, Config.JWT_ALGORITHM, None
+
+
+def get_verification_params(jwt_token: str) -> tuple:
+    kid = jwt.get_unverified_header(jwt_token).get("kid") if JWT_KEY_SET is not None else None
+    if kid is None:
+        if JWT_KEY_SET is not None and not Config.JWT_ACCEPT_SECRET_TOKENS:
+            raise jwt.InvalidTokenError("Token has no 'kid' header.")
+        return Config.JWT_SECRET, Config.JWT_ALGORITHM
+    verification_key = JWT_KEY_SET.get_verification_key(kid)
+    if verification_key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key '{kid}'.")
+    algorithm, public_key = verification_key
+    return public_key, algorithm
+
+
+def build_user_claims(user_data: dict) -> Optional[dict]:
+    # Compact claims: native 'sub' (user id) plus short 'role'/'uname', so verifying needs a single decode pass
     try:
-        user_data_str = json.dumps(user_data)
-    except TypeError as e:
-        print(f"Encountered the following error while serializing user data: {str(e)}")
-        # traceback.print_exc()
+        return {"sub": str(user_data["id"]), "role": str(user_data["role"]), "uname": str(user_data["username"])}
+    except KeyError as e:
+        print(f"Encountered the following error while building token claims: missing {str(e)}")
         return None
-    payload["sub"] = user_data_str
+
+
+def read_user_claims(token_payload: dict) -> Optional[dict]:
+    # Inverse of build_user_claims; None for tokens that predate the compact format
+    if "uname" not in token_payload:
+        return None
+    return {"id": token_payload["sub"], "username": token_payload["uname"], "role": token_payload["role"]}
+
+
+def issue_token(user_data: dict, refresh_token_flag: bool = False) -> Optional[tuple[str, dict]]:
+    # Returns the encoded token together with its claims (callers need 'jti'/'exp' to index the session)
+    payload = build_user_claims(user_data)
+    if payload is None:
+        return None
+    now = datetime.now(timezone.utc)
     payload["exp"] = int(
         (
-            datetime.now(timezone.utc)
+            now
             + (
                 timedelta(minutes=Config.ACCESS_TOKEN_EXP)
                 if not refresh_token_flag
@@ -44,22 +172,32 @@ def create_token(user_data: dict, refresh_token_flag: bool = False) -> Optional[
             )
         ).timestamp()
     )
+    payload["iat"] = round(now.timestamp(), 3)  # sub-second, compared against "revoke all sessions" watermarks
     payload["jti"] = str(uuid.uuid4())
     payload["is_refresh"] = refresh_token_flag
+    signing_key, algorithm, headers = get_signing_params()
     jwt_token = jwt.encode(
         payload=payload,
-        key=Config.JWT_SECRET,
-        algorithm=Config.JWT_ALGORITHM,
+        key=signing_key,
+        algorithm=algorithm,
+        headers=headers,
     )
-    return jwt_token
+    return jwt_token, payload
+
+
+def create_token(user_data: dict, refresh_token_flag: bool = False) -> Optional[str]:
+    issued = issue_token(user_data=user_data, refresh_token_flag=refresh_token_flag)
+    return issued[0] if issued else None
 
 
+@timed_stage("jwt_decode")
 def decode_token(jwt_token: str) -> Optional[dict]:
     # try:
+    verification_key, algorithm = get_verification_params(jwt_token)
     token_payload = jwt.decode(
         jwt=jwt_token,
-        key=Config.JWT_SECRET,
-        algorithms=Config.JWT_ALGORITHM,
+        key=verification_key,
+        algorithms=[algorithm],
     )
     return token_payload
     # except ExpiredSignatureError:
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+
+class MicroBatcher:
+    # Coalesces items submitted within 'max_delay' seconds into a single call of 'flush_func'.
+    # 'flush_func' receives the items and returns one result per item; an Exception result is raised to its caller.
+    def __init__(self, flush_func: Callable[[list], Awaitable[list]], max_batch_size: int, max_delay: float):
+        self.flush_func = flush_func
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._items = 0
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        # Let the worker flush whatever is still queued, then cancel it while it idles on an empty queue
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def submit(self, item: Any) -> Any:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _drain(self, batch: list) -> list:
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.max_delay)
+            await self._flush(self._drain(batch))
+
+    async def _flush(self, batch: list) -> None:
+        self._batches += 1
+        self._items += len(batch)
+        try:
+            results = await self.flush_func([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            self._queue.task_done()
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
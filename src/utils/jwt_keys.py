@@ -0,0 +1,84 @@
+# Asymmetric JWT keys kept as a local JWKS file.
+# Generate and append a new signing key (from the src directory):
+#     python -m utils.jwt_keys <kid> [EdDSA|ES256] [jwks_path]
+# then point JWT_SIGNING_KEY_ID at the new kid. Keep the old entries until their tokens have expired.
+import json
+import os
+import sys
+import time
+from typing import Any, Optional
+from jwt import PyJWK
+from jwt.algorithms import get_default_algorithms
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+
+class JWTKeySet:
+    # Keys are parsed once into key objects; the file is re-read only when an unknown 'kid' shows up (rotation)
+    def __init__(self, jwks_path: str, signing_kid: Optional[str] = None, reload_interval: float = 30.0):
+        self.jwks_path = jwks_path
+        self.signing_kid = signing_kid
+        self.reload_interval = reload_interval
+        self.signing_key: Optional[tuple[str, str, Any]] = None
+        self._verification_keys: dict[str, tuple[str, Any]] = {}
+        self._public_jwks: list[dict] = []
+        self._last_load = 0.0
+        self.load()
+
+    def load(self) -> None:
+        with open(self.jwks_path) as jwks_file:
+            jwks = json.load(jwks_file)
+        algorithms = get_default_algorithms()
+        signing_key, verification_keys, public_jwks = None, {}, []
+        for jwk_data in jwks["keys"]:
+            jwk = PyJWK(jwk_data)
+            public_key = jwk.key.public_key() if hasattr(jwk.key, "public_key") else jwk.key
+            verification_keys[jwk.key_id] = (jwk.algorithm_name, public_key)
+            public_jwk = algorithms[jwk.algorithm_name].to_jwk(public_key, as_dict=True)
+            public_jwks.append({**public_jwk, "kid": jwk.key_id, "alg": jwk.algorithm_name, "use": "sig"})
+            if jwk.key_id == self.signing_kid:
+                if "d" not in jwk_data:
+                    raise ValueError(f"JWKS entry '{jwk.key_id}' has no private part and can't be used for signing.")
+                signing_key = (jwk.key_id, jwk.algorithm_name, jwk.key)
+        if self.signing_kid and signing_key is None:
+            raise ValueError(f"Signing key '{self.signing_kid}' was not found in {self.jwks_path}.")
+        self.signing_key, self._verification_keys, self._public_jwks = signing_key, verification_keys, public_jwks
+        self._last_load = time.monotonic()
+
+    def get_verification_key(self, kid: str) -> Optional[tuple[str, Any]]:
+        key = self._verification_keys.get(kid)
+        if key is None and time.monotonic() - self._last_load >= self.reload_interval:
+            try:
+                self.load()
+            except (OSError, ValueError) as e:
+                print(f"Encountered the following error while reloading JWT keys: {str(e)}")
+                self._last_load = time.monotonic()
+            key = self._verification_keys.get(kid)
+        return key
+
+    def get_public_jwks(self) -> dict:
+        return {"keys": self._public_jwks}
+
+
+def generate_private_jwk(kid: str, algorithm: str = "EdDSA") -> dict:
+    if algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError("Only EdDSA and ES256 keys are supported.")
+    jwk = get_default_algorithms()[algorithm].to_jwk(private_key, as_dict=True)
+    return {**jwk, "kid": kid, "alg": algorithm, "use": "sig"}
+
+
+if __name__ == "__main__":
+    new_kid = sys.argv[1]
+    new_algorithm = sys.argv[2] if len(sys.argv) > 2 else "EdDSA"
+    path = sys.argv[3] if len(sys.argv) > 3 else "jwks.json"
+    existing = {"keys": []}
+    if os.path.exists(path):
+        with open(path) as jwks_file:
+            existing = json.load(jwks_file)
+    existing["keys"].append(generate_private_jwk(new_kid, new_algorithm))
+    with open(path, "w") as jwks_file:
+        json.dump(existing, jwks_file, indent=2)
+    print(f"Added {new_algorithm} key '{new_kid}' to {path}.")
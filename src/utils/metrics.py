@@ -0,0 +1,145 @@
+import asyncio
+import functools
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+
+# Seconds; tuned for an API whose stages range from sub-millisecond cache hits to ~100ms bcrypt calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in self._values.items():
+            lines.append(f"{self.name}{format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    # Per label set: one (non-cumulative) count per bucket plus sum and count; made cumulative only when rendered
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in self._series.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                bucket_labels = format_labels(self.label_names, label_values, f'le="{upper_bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+REQUEST_LATENCY = METRICS.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+STAGE_LATENCY = METRICS.histogram(
+    "app_stage_duration_seconds",
+    "Latency of instrumented stages (auth, Redis, bcrypt, SQL, serialization).",
+    ("stage",),
+)
+STAGE_ERRORS = METRICS.counter("app_stage_errors_total", "Instrumented stages that raised.", ("stage",))
+
+# Stage timings of the request being handled, so a single slow request can be broken down (Server-Timing)
+REQUEST_STAGES: ContextVar[Optional[dict]] = ContextVar("request_stages", default=None)
+
+
+def record_stage(stage: str, elapsed: float) -> None:
+    STAGE_LATENCY.observe(elapsed, stage)
+    stages = REQUEST_STAGES.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+def timed_stage(stage: str) -> Callable:
+    # Decorator for sync and async functions alike. Each call costs a histogram observation, so wrap batch-level
+    # calls rather than per-row helpers; the model serializers are wrapped by the routes that call them
+    # (serialize_many per page), which also keeps database.models free of app imports for Alembic.
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    STAGE_ERRORS.inc(stage)
+                    raise
+                finally:
+                    record_stage(stage, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                STAGE_ERRORS.inc(stage)
+                raise
+            finally:
+                record_stage(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
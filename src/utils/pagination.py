@@ -0,0 +1,28 @@
+import base64
+import json
+import uuid
+from typing import Optional
+from datetime import datetime
+
+
+def encode_keyset_cursor(sort_value: datetime, id: uuid.UUID) -> str:
+    raw = json.dumps([sort_value.isoformat(), str(id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    # Raises ValueError for anything that wasn't produced by encode_keyset_cursor
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), uuid.UUID(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid pagination cursor.") from e
+
+
+def build_keyset_filter(cursor: Optional[str], sort_field: str) -> dict:
+    # Rows strictly after the cursor in (sort_field DESC, id DESC) order; raises ValueError for a bad cursor
+    if not cursor:
+        return {}
+    # A row-value comparison lets Postgres seek straight into a (sort_field DESC, id DESC) index
+    return {f"{sort_field},id__lt": decode_keyset_cursor(cursor)}
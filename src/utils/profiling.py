@@ -0,0 +1,79 @@
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+import uuid
+from collections import deque
+from typing import Optional
+
+
+class RequestProfiler:
+    # Profiles a random sample of requests with cProfile and keeps the ones slower than the threshold.
+    # cProfile hooks the whole thread, so only one request is profiled at a time, and the profile also
+    # contains whatever other coroutines ran on the event loop meanwhile (interleaved requests, batchers).
+    def __init__(self, sample_rate: float, threshold_ms: float, max_profiles: int):
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self._profiles: deque[dict] = deque(maxlen=max_profiles)
+        self._active = False
+        self.sampled = 0
+        self.kept = 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if self._active or random.random() >= self.sample_rate:
+            return None
+        self._active = True
+        self.sampled += 1
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler: cProfile.Profile, duration_ms: float, tags: dict) -> None:
+        profiler.disable()
+        self._active = False
+        if duration_ms < self.threshold_ms:
+            return
+        profiler.create_stats()
+        self.kept += 1
+        self._profiles.appendleft(
+            {
+                "id": str(uuid.uuid4()),
+                "captured_at": time.time(),
+                "duration_ms": duration_ms,
+                **tags,
+                "stats": profiler.stats,
+            }
+        )
+
+    def list_profiles(self) -> list[dict]:
+        return [{key: value for key, value in profile.items() if key != "stats"} for profile in self._profiles]
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        return next((profile for profile in self._profiles if profile["id"] == profile_id), None)
+
+    def render_profile(self, profile_id: str, sort_by: str = "cumulative", limit: int = 50) -> Optional[str]:
+        profile = self.get_profile(profile_id)
+        if profile is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(stream=output)
+        stats.stats = dict(profile["stats"])
+        stats.get_top_level_stats()
+        stats.strip_dirs().sort_stats(sort_by).print_stats(limit)
+        return output.getvalue()
+
+    def dump_profile(self, profile_id: str) -> Optional[bytes]:
+        # Same format as cProfile's output file, loadable by pstats, snakeviz or flameprof for flame graphs
+        profile = self.get_profile(profile_id)
+        return marshal.dumps(profile["stats"]) if profile else None
+
+    def get_stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "threshold_ms": self.threshold_ms,
+            "sampled": self.sampled,
+            "kept": self.kept,
+            "stored": len(self._profiles),
+        }
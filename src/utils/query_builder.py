@@ -1,8 +1,11 @@
-from sqlalchemy import and_, or_, not_, select, true
+from typing import Optional, Union
+from sqlalchemy import and_, or_, not_, select, true, bindparam, tuple_, text
 from sqlalchemy.sql import operators, Select, ClauseElement, ColumnElement
-from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
 from sqlalchemy.orm import DeclarativeMeta
 
+from utils.cache import TTLCache
+
 OPERATOR_MAP = {
     "eq": operators.eq,
     "ne": operators.ne,
@@ -21,6 +24,15 @@ def parse_filter(model: DeclarativeMeta, field: str, value) -> BinaryExpression:
     if "__" in field:
         # E.g.: (MyObj, {"age__gt": 30}) --> (MyObj.age > 30)
         field_name, op = field.split("__")
+        if "," in field_name:
+            # E.g.: (MyObj, {"age,id__lt": (30, 7)}) --> ((MyObj.age, MyObj.id) < (30, 7))
+            columns = [getattr(model, name) for name in field_name.split(",")]
+            # Bound parameters inside a tuple don't inherit the column types, so they are typed explicitly
+            values = [
+                bindparam(item.key, type_=column.type) if isinstance(item, BindParameter) else item
+                for column, item in zip(columns, value)
+            ]
+            return OPERATOR_MAP[op](tuple_(*columns), tuple_(*values, types=[column.type for column in columns]))
         column = getattr(model, field_name)
         return OPERATOR_MAP[op](column, value)
     else:
@@ -45,9 +57,83 @@ def parse_order_by_column(model: DeclarativeMeta, field: tuple) -> ColumnElement
     return getattr(model, column).desc() if order == 1 else getattr(model, column)
 
 
-def build_select_query(model: DeclarativeMeta, where_filter: dict = {}, order_by_cols: list[tuple] = []) -> Select:
-    return (
+def build_select_query(
+    model: DeclarativeMeta,
+    where_filter: dict = {},
+    order_by_cols: list[tuple] = [],
+    limit: Optional[Union[int, BindParameter]] = None,
+) -> Select:
+    query = (
         select(model)
         .where(build_where_clause(model, where_filter) if where_filter else true())
         .order_by(*(parse_order_by_column(model, field) for field in order_by_cols))
     )
+    return query.limit(limit) if limit is not None else query
+
+
+# -----------------------------------
+# ----- Cached Statement Builder -----
+
+STATEMENT_CACHE = TTLCache(max_size=256)
+EXPANDING_OPERATORS = {"in", "notin"}
+
+
+def parametrize_filter(where_filter: dict, params: dict) -> tuple[dict, tuple]:
+    # Swaps literal values for named bind parameters, returning the rewritten filter and its hashable shape
+    if "_and" in where_filter or "_or" in where_filter:
+        key = "_and" if "_and" in where_filter else "_or"
+        parametrized = [parametrize_filter(condition, params) for condition in where_filter[key]]
+        return {key: [item[0] for item in parametrized]}, (key, tuple(item[1] for item in parametrized))
+    elif "_not" in where_filter:
+        condition, shape = parametrize_filter(where_filter["_not"], params)
+        return {"_not": condition}, ("_not", shape)
+    parametrized, shape = {}, []
+    for field, value in where_filter.items():
+        if value is None:
+            # Kept literal so that (column == None) still renders as IS NULL
+            parametrized[field] = None
+            shape.append((field, None))
+            continue
+        if "," in field.split("__")[0]:
+            # Row-value comparison: one parameter per tuple element
+            param_names = []
+            for item in value:
+                param_names.append(f"p{len(params)}")
+                params[param_names[-1]] = item
+            parametrized[field] = tuple(bindparam(param_name) for param_name in param_names)
+            shape.append((field, tuple(param_names)))
+            continue
+        param_name = f"p{len(params)}"
+        params[param_name] = value
+        expanding = "__" in field and field.split("__")[1] in EXPANDING_OPERATORS
+        parametrized[field] = bindparam(param_name, expanding=expanding)
+        shape.append((field, param_name))
+    return parametrized, tuple(shape)
+
+
+def build_cached_select_query(
+    model: DeclarativeMeta,
+    where_filter: dict = {},
+    order_by_cols: list[tuple] = [],
+    limit: Optional[int] = None,
+    literal_predicate: Optional[str] = None,
+) -> tuple[Select, dict]:
+    # Same as build_select_query, but returns a shared prebuilt statement plus the params to execute it with.
+    # 'literal_predicate' is fixed SQL ANDed in as is (never parametrized), e.g. to match a partial index.
+    params = {}
+    parametrized_filter, shape = parametrize_filter(where_filter, params) if where_filter else ({}, ())
+    cache_key = (model, shape, tuple(tuple(field) for field in order_by_cols), limit is not None, literal_predicate)
+    statement = STATEMENT_CACHE.get(cache_key)
+    if statement is None:
+        statement = build_select_query(
+            model=model,
+            where_filter=parametrized_filter,
+            order_by_cols=order_by_cols,
+            limit=bindparam("limit") if limit is not None else None,
+        )
+        if literal_predicate is not None:
+            statement = statement.where(text(literal_predicate))
+        STATEMENT_CACHE.set(cache_key, statement)
+    if limit is not None:
+        params["limit"] = limit
+    return statement, params
@@ -0,0 +1,42 @@
+import time
+from utils.cache import TTLCache
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        # Returns 0 when a token was taken, otherwise the seconds until one is available
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+
+class LocalRateLimiter:
+    # Per-worker buckets sized to the global limit: one worker alone can never legitimately exceed it,
+    # so whatever the local bucket rejects is rejected without asking Redis
+    def __init__(self, max_keys: int):
+        self._buckets = TTLCache(max_size=max_keys)
+        self.rejected = 0
+
+    def take(self, key: str, limit: int, window: int) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity=limit, refill_rate=limit / window)
+        # An idle bucket refills completely within one window, so it can be dropped after that
+        self._buckets.set(key, bucket, ttl=window)
+        retry_after = bucket.take()
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def get_stats(self) -> dict:
+        return {"rejected_locally": self.rejected, "buckets": self._buckets.get_stats()}